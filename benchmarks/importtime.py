@@ -0,0 +1,113 @@
+"""
+Import time benchmark for the validators package
+
+Starts a fresh interpreter for each run, and measures the time it takes to
+run typical import statements, minus the time it takes to start an
+interpreter that imports nothing. Also lists the expensive modules that are
+imported as a side effect.
+
+Run with::
+
+    python -m benchmarks.importtime
+
+The results can be saved as JSON with ``-o`` and compared using the
+``compare`` command of ``benchmarks.suite``.
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+
+STATEMENTS = {
+    'package': 'import validators',
+    'spec': ('from validators import spec_validator, required, istype\n'
+             'spec_validator({"a": [required, istype(int)]})'),
+    'url': 'from validators import url\nurl("http://example.com/")',
+    'timestamp': ('from validators import timestamp\n'
+                  'timestamp("%Y-%m-%d")("2015-04-29")'),
+    'everything': 'from validators import *',
+}
+
+# Modules whose import is avoided unless they are needed
+WATCHED = ['re', 'datetime', 'calendar', 'numpy', 'threading']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def environ():
+    """ Return environment in which the package in this tree is imported """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    return env
+
+
+def run(code):
+    """ Run code in a fresh interpreter and return the time it took """
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', code], env=environ())
+    return time.time() - start
+
+
+def loaded(code):
+    """ Return watched modules that are imported by the code """
+    check = '{}\nimport sys\nprint(" ".join(m for m in {!r} if m in ' \
+            'sys.modules))'.format(code, WATCHED)
+    out = subprocess.check_output([sys.executable, '-c', check],
+                                  env=environ())
+    return out.decode('ascii').split()
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure(repeat):
+    """ Return a dict mapping statement names to median import time """
+    base = median([run('pass') for _ in range(repeat)])
+    results = {}
+    for name, code in sorted(STATEMENTS.items()):
+        results['import.' + name] = max(
+            median([run(code) for _ in range(repeat)]) - base, 0.0)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='number of runs per statement (default: 20)')
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help='save results as JSON to PATH')
+    args = parser.parse_args(argv)
+    results = measure(args.repeat)
+    for name, code in sorted(STATEMENTS.items()):
+        print('{:<24}{:>10.1f}ms  {}'.format(
+            name, results['import.' + name] * 1e3,
+            ' '.join(loaded(code)) or '-'))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'timestamp': time.time(),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Cold build and warm load benchmark for persisted spec validators
+
+Builds a large spec with ``spec_validator()`` (cold start), and loads the
+same validator saved with ``validators.plans.save_plan()`` (warm start), each
+in a fresh interpreter, and reports the median times. Both times include
+the imports and the validation of the first record, so work that is deferred
+until the validator is first used is not left out.
+
+Run with::
+
+    python -m benchmarks.plans
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+
+# Builds a spec of given size with a mix of isin(), match() and numeric
+# chains and prints the time it took
+COLD = '''
+import re, time
+start = time.time()
+from validators import *
+spec = {}
+for i in range(%(keys)d):
+    if i %% 3 == 0:
+        choices = set('v%%d' %% j for j in range(50))
+        spec['k%%d' %% i] = [required, isin(choices)]
+    elif i %% 3 == 1:
+        regex = re.compile(r'^[a-z]+%%d$' %% i)
+        spec['k%%d' %% i] = [optional(), match(regex)]
+    else:
+        spec['k%%d' %% i] = [required, istype(int), gte(0), lte(i)]
+%(build)s
+%(first)s
+print(time.time() - start)
+'''
+
+# Validates the first record, so that work deferred to the first call (e.g.,
+# compiling regular expressions) is included in the time
+FIRST = '''
+record = {}
+for i in range(%(keys)d):
+    record['k%%d' %% i] = ['v1', 'abc%%d' %% i, i][i %% 3]
+assert validator(record) == {}
+'''
+
+BUILD = 'validator = spec_validator(spec)'
+SAVE = ('from validators.plans import save_plan\n'
+        'validator = save_plan(%(path)r, spec, "bench")')
+WARM = '''
+import time
+start = time.time()
+from validators.plans import load_plan
+validator = load_plan(%(path)r, "bench")
+%(first)s
+print(time.time() - start)
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return float(out.decode('ascii').strip())
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--keys', type=int, default=3000,
+                        help='number of keys in the spec (default: 3000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs (default: 5)')
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help='save results as JSON to PATH')
+    args = parser.parse_args(argv)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'plan.pickle')
+        params = {'keys': args.keys, 'path': path}
+        params['first'] = FIRST % params
+        run(COLD % dict(params, build=SAVE % params))
+        cold = median([run(COLD % dict(params, build=BUILD))
+                       for _ in range(args.repeat)])
+        warm = median([run(WARM % params) for _ in range(args.repeat)])
+    finally:
+        shutil.rmtree(tmpdir)
+    print('{} keys'.format(args.keys))
+    print('cold build  {:>10.1f}ms'.format(cold * 1e3))
+    print('warm load   {:>10.1f}ms'.format(warm * 1e3))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': {'plans.cold': cold, 'plans.warm': warm}},
+                      f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+ReDoS regression benchmark for the URL validator
+
+Measures the latency of ``validators.urls.is_url()`` on crafted inputs of
+increasing length, and fails if the 99th percentile latency grows faster
+than linearly with input length, or exceeds the per-character budget.
+
+Run with::
+
+    python -m benchmarks.redos
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+import argparse
+
+from validators.urls import is_url
+from validators.re_patterns import URL_RE
+
+
+SIZES = [1000, 4000, 16000, 64000]
+
+# Maximum p99 latency per character of input, in seconds
+BUDGET = 2e-6
+
+# Maximum allowed ratio between growth of p99 latency and growth of input size
+# from the smallest to the largest input
+MAX_GROWTH = 4.0
+
+
+def payloads(size):
+    """ Return a dict of hostile inputs approximately ``size`` long """
+    return {
+        'long-label': 'http://' + 'a' * size + '!',
+        'many-labels': 'http://' + 'a.' * (size // 2) + '!',
+        'max-labels': 'http://' + ('a' * 62 + '.') * (size // 63) + ' ',
+        'hyphens': 'http://' + 'a-' * (size // 2) + '.a!',
+        'long-tld': 'http://a.' + 'b' * size + '/ x',
+        'digits': 'http://' + '1.' * (size // 2) + '1x',
+        'path': 'http://example.com/' + 'a' * size + ' ',
+    }
+
+
+def p99(fn, s, repeat, number=5):
+    """ Return 99th percentile of latency over ``repeat`` samples
+
+    Each sample is the mean latency of ``number`` consecutive calls.
+    """
+    timer = timeit.Timer(lambda: fn(s))
+    times = sorted(t / number for t in timer.repeat(repeat, number))
+    return times[min(len(times) - 1, int(len(times) * 0.99))]
+
+
+def measure(fn, repeat):
+    """ Return a dict mapping payload name to list of p99 latencies """
+    results = {}
+    for size in SIZES:
+        for name, s in payloads(size).items():
+            results.setdefault(name, []).append(p99(fn, s, repeat))
+    return results
+
+
+def check(results):
+    """ Return a list of payload names whose latency is out of bounds """
+    failed = []
+    for name, times in sorted(results.items()):
+        growth = times[-1] / max(times[0], 1e-9)
+        if (growth > MAX_GROWTH * SIZES[-1] / SIZES[0] or
+                times[-1] > BUDGET * SIZES[-1]):
+            failed.append(name)
+    return failed
+
+
+def report(label, results):
+    print(label)
+    print('  {:<14}'.format('payload') +
+          ''.join('{:>12}'.format(size) for size in SIZES))
+    for name, times in sorted(results.items()):
+        print('  {:<14}'.format(name) +
+              ''.join('{:>10.1f}us'.format(t * 1e6) for t in times))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=100,
+                        help='number of runs per payload (default: 100)')
+    parser.add_argument('--compare', action='store_true',
+                        help='also measure the URL_RE regex')
+    args = parser.parse_args(argv)
+    results = measure(is_url, args.repeat)
+    report('is_url() p99 latency', results)
+    if args.compare:
+        report('URL_RE p99 latency', measure(URL_RE.match, args.repeat))
+    failed = check(results)
+    if failed:
+        print('FAILED: ' + ', '.join(failed))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
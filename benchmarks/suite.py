@@ -0,0 +1,260 @@
+"""
+Benchmark suite for the built-in validators, chains and specs
+
+Measures the time per call of each built-in validator on the pass and fail
+path, chains of increasing depth, ``OR()`` and ``NOT()`` overhead,
+``listof()`` with lists of increasing size, and ``spec_validator()`` with
+specs of increasing width (including revalidation of a single changed
+key). The results are saved as JSON, and two result files can be compared
+to find regressions.
+
+Run with::
+
+    python -m benchmarks.suite run -o before.json
+    python -m benchmarks.suite run -o after.json
+    python -m benchmarks.suite compare before.json after.json
+
+Benchmarks of validators that are missing from the measured release are
+skipped, so the suite can also measure older releases.
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from __future__ import print_function
+
+import re
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+
+from validators import helpers
+from validators import validators as v
+from validators.chain import ReturnEarly, chainable, make_chain
+from validators.helpers import OR, NOT, spec_validator
+
+
+DEPTHS = [1, 2, 4, 8, 16, 32]
+LIST_SIZES = [10, 100, 1000, 10000]
+SPEC_WIDTHS = [1, 10, 100, 1000]
+
+# Minimum duration of a single timing run in seconds
+MIN_TIME = 0.02
+
+# Default relative slowdown above which a benchmark is a regression
+THRESHOLD = 0.1
+
+
+def call(fn, value):
+    """ Return a function that calls ``fn`` with value, ignoring errors """
+    def run():
+        try:
+            fn(value)
+        except (ValueError, ReturnEarly):
+            pass
+    return run
+
+
+def builtin(name, args=None):
+    """ Return a built-in validator, or ``None`` if the package lacks it
+
+    Validators added in later releases are skipped, so that the suite can be
+    used to measure older releases. If ``args`` is not ``None``, the
+    validator is created by calling the factory with them.
+    """
+    fn = getattr(v, name, None)
+    if fn is None or args is None:
+        return fn
+    return fn(*args)
+
+
+def validator_cases():
+    """ Yield ``(name, fn)`` pairs for pass and fail path of each validator
+
+    For ``optional()``, the fail path is the value that stops the chain.
+    """
+    cases = [
+        ('optional', (), 1, None),
+        ('required', None, 1, None),
+        ('nonempty', None, 'a', ''),
+        ('boolean', None, True, 'a'),
+        ('deprecated', None, None, 1),
+        ('instanceof', (int,), 1, 'a'),
+        ('istype', (int,), 1, 'a'),
+        ('isin', ([1, 2, 3],), 3, 4),
+        ('gte', (0,), 1, -1),
+        ('lte', (0,), -1, 1),
+        ('match', (re.compile(r'^\d+$'),), '123', 'abc'),
+        ('url', None, 'http://example.com/path', 'http://'),
+        ('bounded_url', (255,), 'http://example.com/path', 'http://'),
+        ('timestamp', ('%Y-%m-%d',), '2015-04-29', '2015-02-30'),
+        ('min_len', (2,), 'abc', 'a'),
+        ('listof', (v.istype(int),), [1, 2, 3], [1, 'a']),
+    ]
+    for name, args, ok, bad in cases:
+        fn = builtin(name, args)
+        if fn is None:
+            continue
+        yield 'validator.{}.pass'.format(name), call(fn, ok)
+        yield 'validator.{}.fail'.format(name), call(fn, bad)
+
+
+def chain_cases():
+    for depth in DEPTHS:
+        chain = make_chain([v.gte(0)] * depth)
+        yield 'chain.depth.{}'.format(depth), call(chain, 1)
+
+
+def helper_cases():
+    yield 'helpers.plain', call(make_chain([v.istype(int)]), 1)
+    yield 'helpers.OR.first', call(
+        make_chain([OR(v.istype(int), v.istype(str))]), 1)
+    yield 'helpers.OR.last', call(
+        make_chain([OR(v.istype(str), v.istype(int))]), 1)
+    yield 'helpers.OR.fail', call(
+        make_chain([OR(v.istype(str), v.istype(int))]), 1.0)
+    yield 'helpers.NOT.pass', call(make_chain([NOT(v.istype(str))]), 1)
+    yield 'helpers.NOT.fail', call(make_chain([NOT(v.istype(int))]), 1)
+
+
+def listof_cases():
+    for size in LIST_SIZES:
+        data = list(range(size))
+        yield 'listof.builtin.{}'.format(size), call(
+            v.listof(v.gte(0)), data)
+        yield 'listof.custom.{}'.format(size), call(
+            v.listof(chainable(lambda x: x)), data)
+
+
+def spec_cases():
+    for width in SPEC_WIDTHS:
+        spec = dict((i, [v.required, v.istype(int), v.gte(0)])
+                    for i in range(width))
+        data = list(range(width))
+        invalid = [-1] * width
+        yield 'spec.width.{}.pass'.format(width), call(
+            spec_validator(spec), data)
+        yield 'spec.width.{}.fail'.format(width), call(
+            spec_validator(spec), invalid)
+        if not hasattr(helpers, 'IncrementalValidator'):
+            continue
+        incremental = helpers.IncrementalValidator(spec)
+        incremental(data)
+        yield 'spec.width.{}.incremental'.format(width), call(
+            lambda obj: incremental(obj, changed=[0]), data)
+
+
+GROUPS = [validator_cases, chain_cases, helper_cases, listof_cases,
+          spec_cases]
+
+
+def cases(pattern=None):
+    """ Return a list of ``(name, fn)`` pairs, optionally filtered by regex """
+    found = []
+    for group in GROUPS:
+        for name, fn in group():
+            if pattern is None or re.search(pattern, name):
+                found.append((name, fn))
+    return found
+
+
+def measure(fn, repeat):
+    """ Return the best time per call in seconds over ``repeat`` runs
+
+    The number of calls per run is chosen so that each run takes at least
+    ``MIN_TIME`` seconds.
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < MIN_TIME:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(pattern=None, repeat=5, out=sys.stdout):
+    results = {}
+    for name, fn in cases(pattern):
+        results[name] = measure(fn, repeat)
+        print('{:<32}{:>12.3f}us'.format(name, results[name] * 1e6),
+              file=out)
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+
+def compare(before, after, threshold=THRESHOLD):
+    """ Return a list of ``(name, before, after, ratio)`` for regressions
+
+    A benchmark is a regression if time per call in ``after`` is more than
+    ``threshold`` (relative) slower than in ``before``. Benchmarks that are
+    not in both results are ignored.
+    """
+    regressions = []
+    for name, old in sorted(before['results'].items()):
+        new = after['results'].get(name)
+        if new is None:
+            continue
+        ratio = new / max(old, 1e-12)
+        if ratio > 1 + threshold:
+            regressions.append((name, old, new, ratio))
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', metavar='PATH',
+                            help='save results as JSON to PATH')
+    run_parser.add_argument('-k', '--filter', metavar='REGEX',
+                            help='only run benchmarks matching REGEX')
+    run_parser.add_argument('--repeat', type=int, default=5,
+                            help='number of runs per benchmark (default: 5)')
+    compare_parser = commands.add_parser(
+        'compare', help='compare two result files and report regressions')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                help='relative slowdown reported as '
+                                'regression (default: {})'.format(THRESHOLD))
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(args.filter, args.repeat)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        return 0
+
+    if args.command == 'compare':
+        before = load(args.before)
+        after = load(args.after)
+        regressions = compare(before, after, args.threshold)
+        for name, old, new, ratio in regressions:
+            print('REGRESSION {:<32}{:>10.3f}us ->{:>10.3f}us '
+                  '({:+.0%})'.format(name, old * 1e6, new * 1e6, ratio - 1))
+        if regressions:
+            return 1
+        print('No regressions')
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Tests for validators.aio module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import asyncio
+
+import pytest
+
+from validators.chain import chainable, ReturnEarly
+from validators.validators import required, optional, gte
+import validators.aio as mod
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@chainable
+async def exists(v):
+    await asyncio.sleep(0)
+    if v not in (1, 2, 3):
+        raise ValueError('value does not exist', 'exists')
+    return v
+
+
+def test_async_chain():
+    """
+    Given a list of synchronous and asynchronous chainable validators, when
+    make_async_chain() is called, then it returns a coroutine function that
+    validates the value using all validators.
+    """
+    chain = mod.make_async_chain([required, exists, gte(2)])
+    assert run(chain(2)) == 2
+    with pytest.raises(ValueError):
+        run(chain(4))
+    with pytest.raises(ValueError):
+        run(chain(1))
+
+
+def test_async_chain_return_early():
+    """
+    Given a chain with an asynchronous validator that raises ReturnEarly, when
+    the chain is called, then it returns the original value.
+    """
+    @chainable
+    async def skip(v):
+        raise ReturnEarly()
+
+    chain = mod.make_async_chain([optional(), skip, exists])
+    assert run(chain(None)) is None
+    assert run(chain(7)) == 7
+
+
+def test_async_spec_validator():
+    """
+    Given a spec with asynchronous validators, when async_spec_validator() is
+    called, then it returns a coroutine function that returns a dict of
+    errors.
+    """
+    validator = mod.async_spec_validator({
+        'foo': [required, exists],
+        'bar': [optional(), exists],
+        'baz': [gte(2)],
+    })
+    assert run(validator({'foo': 1, 'bar': None, 'baz': 2})) == {}
+    errors = run(validator({'foo': 4, 'bar': 5, 'baz': 2}))
+    assert sorted(errors) == ['bar', 'foo']
+    assert errors['foo'].args == ('value does not exist', 'exists')
+
+
+def test_async_spec_validator_concurrency():
+    """
+    Given a concurrency limit, when the validator is called, then no more
+    than the given number of chains is run at the same time.
+    """
+    state = {'running': 0, 'max': 0}
+
+    @chainable
+    async def slow(v):
+        state['running'] += 1
+        state['max'] = max(state['max'], state['running'])
+        await asyncio.sleep(0.01)
+        state['running'] -= 1
+        return v
+
+    spec = {k: [slow] for k in 'abcdef'}
+    data = {k: 1 for k in 'abcdef'}
+    run(mod.async_spec_validator(spec, concurrency=2)(data))
+    assert state['max'] == 2
+    state['max'] = 0
+    run(mod.async_spec_validator(spec)(data))
+    assert state['max'] == 6
+
+
+def test_async_spec_validator_other_exceptions():
+    """
+    Given a chain that raises an exception other than ValueError, when the
+    validator is called, then the exception is propagated.
+    """
+    validator = mod.async_spec_validator({'foo': [gte(2)]})
+    with pytest.raises(TypeError):
+        run(validator({'foo': None}))
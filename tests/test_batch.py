@@ -0,0 +1,131 @@
+"""
+Tests for validators.batch module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import pytest
+
+from validators.chain import make_chain, chainable
+from validators.validators import (required, istype, isin, gte, lte, boolean,
+                                   nonempty, optional)
+import validators.batch as mod
+
+
+def test_many_builtins():
+    """
+    Given a chain of built-in validators, when many() is called with a list of
+    values, then it returns the values and a list of index-error pairs for
+    values that fail.
+    """
+    chain = make_chain([required, istype(int), gte(2), lte(10)])
+    results, errors = chain.many([2, None, 1, 5, '3', 11])
+    assert results == [2, None, 1, 5, '3', 11]
+    assert [i for i, _ in errors] == [1, 2, 4, 5]
+    assert [err.args[1] for _, err in errors] == [
+        'required', 'gte', 'istype', 'lte']
+
+
+def test_many_matches_single_calls():
+    """
+    Given a chain of built-in validators, when many() is called, then the
+    errors are the same as the ones raised by calling the chain on each value.
+    """
+    chain = make_chain([nonempty, isin([1, 2, True, '']), boolean])
+    values = [1, 2, True, '', 3, False]
+    _, errors = chain.many(values)
+    expected = []
+    for i, v in enumerate(values):
+        try:
+            chain(v)
+        except ValueError as err:
+            expected.append((i, err.args))
+    assert [(i, err.args) for i, err in errors] == expected
+
+
+def test_many_propagates_other_exceptions():
+    """
+    Given a chain of built-in validators, when a value causes an exception
+    other than ValueError, then the exception is propagated.
+    """
+    chain = make_chain([gte(2)])
+    with pytest.raises(TypeError):
+        chain.many([3, None])
+
+
+def test_many_custom_validators():
+    """
+    Given a chain with custom validators, when many() is called, then the
+    values returned by the chain are collected.
+    """
+    @chainable
+    def double(v):
+        if v < 0:
+            raise ValueError('negative', 'double')
+        return v * 2
+
+    chain = make_chain([optional(), double])
+    results, errors = chain.many(iter([1, None, -1]))
+    assert results == [2, None, -1]
+    assert [i for i, _ in errors] == [2]
+
+
+def test_describe():
+    """
+    Given a list of validators, when describe() is called, then it returns
+    codes and parameters of built-in validators, or None if any of the
+    validators is not a built-in.
+    """
+    assert mod.describe([required, gte(2)]) == [('required', ()),
+                                                ('gte', (2,))]
+    assert mod.describe([required, optional()]) is None
+
+
+def test_many_numpy():
+    """
+    Given a NumPy array, when many() is called, then the array is validated
+    using vectorized operations, and the array is returned.
+    """
+    numpy = pytest.importorskip('numpy')
+    chain = make_chain([required, gte(2), lte(10), isin({2, 3, 11, 12})])
+    arr = numpy.array([2, 1, 3, 12, 11])
+    results, errors = chain.many(arr)
+    assert results is arr
+    assert [i for i, _ in errors] == [1, 3, 4]
+    assert [err.args[1] for _, err in errors] == ['gte', 'lte', 'lte']
+
+
+def test_many_numpy_types():
+    """
+    Given a NumPy array and a chain that tests value types, when many() is
+    called, then the errors match the ones raised for individual values.
+    """
+    numpy = pytest.importorskip('numpy')
+    arr = numpy.array([1, 2])
+    _, errors = make_chain([istype(int)]).many(arr)
+    assert [i for i, _ in errors] == [0, 1]
+    _, errors = make_chain([istype(numpy.int64)]).many(arr)
+    assert errors == []
+
+
+def test_numpy_not_imported():
+    """
+    Given a fresh interpreter, when the package is imported and a chain is
+    validated in batch, then NumPy is not imported.
+    """
+    import os
+    import sys
+    import subprocess
+
+    code = ('import sys\n'
+            'from validators import make_chain, required\n'
+            'make_chain([required]).many([1, None])\n'
+            'print("numpy" in sys.modules)\n')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    assert out.strip() == b'False'
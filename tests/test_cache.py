@@ -0,0 +1,148 @@
+"""
+Tests for validators.cache module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import pytest
+
+from validators.chain import make_chain, chainable, ReturnEarly
+from validators.validators import required, optional, istype, listof
+from validators.helpers import OR
+import validators.cache as mod
+
+
+def test_lru_cache_eviction():
+    """
+    Given a cache with maxsize, when more items are stored, then the least
+    recently used items are discarded.
+    """
+    cache = mod.LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.set('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.get('c') == (True, 3)
+    assert cache.info() == mod.CacheInfo(3, 1, 0, 2, 2)
+
+
+def test_lru_cache_ttl():
+    """
+    Given a cache with ttl, when an item is looked up after ttl seconds, then
+    it is not found.
+    """
+    now = [0]
+    cache = mod.LRUCache(ttl=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    now[0] = 9
+    assert cache.get('a') == (True, 1)
+    now[0] = 10
+    assert cache.get('a') == (False, None)
+    assert cache.info().currsize == 0
+
+
+def test_memoize_chain(func):
+    """
+    Given a chain, when memoize() is called with it, then it returns a
+    function that calls the chain only once for each value.
+    """
+    x = func(side_effect=lambda v: v)
+    chain = mod.memoize(make_chain([chainable(x)]))
+    assert chain(1) == 1
+    assert chain(1) == 1
+    assert chain(2) == 2
+    assert x.call_count == 2
+    assert chain.cache.info().hits == 1
+    assert chain.cache.info().misses == 2
+
+
+def test_memoize_chain_check(func):
+    """
+    Given a memoized chain, when it is used in listof(), OR() or another
+    chain, then the cache is used.
+    """
+    x = func(side_effect=lambda v: v)
+    chain = mod.memoize(make_chain([chainable(x)]))
+    assert listof(chain)([1, 1, 1, 1]) == [1, 1, 1, 1]
+    assert OR(chain, required)(1) == 1
+    assert make_chain([required, chain])(1) == 1
+    assert chain.many([1, 2])[0] == [1, 2]
+    assert x.call_count == 2
+    assert chain.cache.info().hits == 6
+    assert chain.cache.info().misses == 2
+
+
+def test_memoize_chain_failures():
+    """
+    Given a memoized chain, when its check is called with an invalid value
+    more than once, then a copy of the cached error is returned.
+    """
+    chain = mod.memoize(make_chain([istype(int)]))
+    first = chain.check('a')
+    second = chain.check('a')
+    assert first.error is not second.error
+    assert second.error.args == first.error.args
+    with pytest.raises(ValueError):
+        chain('a')
+    assert chain.cache.info().hits == 2
+
+
+def test_memoize_failures(func):
+    """
+    Given a validator that raises ValueError, when the memoized validator is
+    called again with the same value, then an equal error is raised without
+    calling the validator.
+    """
+    x = func(side_effect=ValueError('bad value', 'bad'))
+    validator = mod.memoize(chainable(x))
+    for _ in range(2):
+        with pytest.raises(ValueError) as exc:
+            validator(1)
+        assert exc.value.args == ('bad value', 'bad')
+    assert x.call_count == 1
+
+
+def test_memoize_chainable():
+    """
+    Given a chainable validator, when memoize() is called with it, then the
+    returned validator can be used in chains.
+    """
+    validator = mod.memoize(optional())
+    chain = make_chain([validator, required])
+    assert chain(None) is None
+    assert chain(None) is None
+    assert chain(1) == 1
+    with pytest.raises(ReturnEarly):
+        validator(None)
+    assert validator.cache.info().hits == 2
+
+
+def test_memoize_types():
+    """
+    Given values that compare equal but are of different types, when the
+    memoized validator is called with them, then their results are cached
+    separately.
+    """
+    validator = mod.memoize(istype(int))
+    assert validator(1) == 1
+    with pytest.raises(ValueError):
+        validator(True)
+
+
+def test_memoize_unhashable(func):
+    """
+    Given an unhashable value, when the memoized validator is called with it,
+    then the validator is called without using the cache.
+    """
+    x = func(side_effect=lambda v: v)
+    validator = mod.memoize(chainable(x))
+    assert validator([1]) == [1]
+    assert validator([1]) == [1]
+    assert x.call_count == 2
+    assert validator.cache.info().bypasses == 2
@@ -8,6 +8,8 @@ This software is free software licensed under the terms of GPLv3. See COPYING
 file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 """
 
+import pytest
+
 import validators.chain as mod
 
 MOD = mod.__name__
@@ -85,3 +87,298 @@ def test_bail_early_return_value(chainable_func):
     y.side_effect = mod.ReturnEarly
     chain = mod.make_chain([cx, cy, cz])
     assert chain(1) == 1
+
+
+def test_chainable_unchained(func):
+    """
+    Given a function, when it is decorated with chainable, then the original
+    function is available as the unchained attribute of the factory.
+    """
+    x = func()
+    cx = mod.chainable(x)
+    assert cx.unchained is x
+    assert mod.unchained(cx) is x
+    assert mod.unchained(lambda nxt: nxt) is None
+
+
+def test_make_chain_single_frame():
+    """
+    Given a chain of chainable functions, when the chain is called, then all
+    validators are called from the same frame.
+    """
+    import sys
+
+    callers = []
+
+    @mod.chainable
+    def track(x):
+        callers.append(sys._getframe(1))
+        return x
+
+    chain = mod.make_chain([track, track, track])
+    assert chain(1) == 1
+    assert len(set(callers)) == 1
+
+
+def test_make_chain_opaque_factory(chainable_func):
+    """
+    Given a chain that contains a factory which is not chainable-decorated,
+    when the chain is called, then the factory is passed the rest of the chain
+    and the functions are called in order.
+    """
+    x, cx = chainable_func()
+    z, cz = chainable_func()
+    calls = []
+
+    def opaque(nxt):
+        def validator(v):
+            calls.append(v)
+            return nxt(v)
+        return validator
+
+    chain = mod.make_chain([cx, opaque, cz])
+    assert chain(1) == z.return_value
+    x.assert_called_once_with(1)
+    assert calls == [x.return_value]
+    z.assert_called_once_with(x.return_value)
+
+
+def test_make_chain_opaque_factory_bail_early(chainable_func):
+    """
+    Given a chain with a factory that is not chainable-decorated, when a
+    validator after the factory raises ReturnEarly, then the original value is
+    returned.
+    """
+    x, cx = chainable_func()
+    z, cz = chainable_func()
+    z.side_effect = mod.ReturnEarly
+    chain = mod.make_chain([cx, lambda nxt: lambda v: nxt(v), cz])
+    assert chain(1) == 1
+
+
+def test_make_chain_empty():
+    """
+    Given an empty list, when make_chain() is called, then the chain returns
+    the value it is passed.
+    """
+    assert mod.make_chain([])(1) == 1
+
+
+def test_validation_error_lazy():
+    """
+    Given a message format string and parameters, when ValidationError is
+    created, then the message is not formatted until it is needed.
+    """
+    class Param(object):
+        formatted = 0
+
+        def __format__(self, spec):
+            Param.formatted += 1
+            return 'param'
+
+    err = mod.ValidationError('value must be {param}', 'code', param=Param())
+    assert Param.formatted == 0
+    assert err.code == 'code'
+    assert str(err) == 'value must be param'
+    assert err.args == ('value must be param', 'code')
+    assert Param.formatted == 1
+
+
+def test_validation_error_args():
+    """
+    Given a ValidationError, when its args are unpacked, then they are the
+    message and the code like for ValueError raised by validators.
+    """
+    err = mod.ValidationError('must be in {collection}', 'isin',
+                              collection=[1, 2])
+    message, code = err.args
+    assert message == 'must be in [1, 2]'
+    assert code == 'isin'
+    assert isinstance(err, ValueError)
+    assert repr(err) == "ValidationError('must be in [1, 2]', 'isin')"
+
+
+def test_validation_error_pickle():
+    """
+    Given a ValidationError, when it is pickled and unpickled, then the copy
+    has the same code, parameters and message.
+    """
+    import pickle
+
+    err = mod.ValidationError('must be {num}', 'gte', num=2)
+    copy = pickle.loads(pickle.dumps(err))
+    assert type(copy) is mod.ValidationError
+    assert copy.code == 'gte'
+    assert copy.params == {'num': 2}
+    assert copy.args == err.args
+
+
+def test_validation_error_braces():
+    """
+    Given a ValidationError without parameters whose message contains
+    braces, then the message is used as is.
+    """
+    err = mod.ValidationError("must be one of {'a', 'b'}", 'isin')
+    assert str(err) == "must be one of {'a', 'b'}"
+    assert err.args == ("must be one of {'a', 'b'}", 'isin')
+    assert repr(err) == (
+        "ValidationError(\"must be one of {'a', 'b'}\", 'isin')")
+
+
+def test_validation_error_set_args():
+    """
+    Given a ValidationError, when its args are assigned, then the new args
+    are used as is.
+    """
+    err = mod.ValidationError('must be {num}', 'gte', num=2)
+    err.args = ('must be {num} or more', 'gte')
+    assert err.args == ('must be {num} or more', 'gte')
+    assert str(err) == 'must be {num} or more'
+    assert err.code == 'gte'
+
+
+def test_checkable():
+    """
+    Given a check function, when it is decorated with checkable and called
+    with a value, then returned errors and STOP are raised as exceptions.
+    """
+    @mod.checkable
+    def check(v):
+        if v is None:
+            return mod.STOP
+        if v < 0:
+            return mod.Invalid(ValueError('negative', 'negative'))
+        return v
+
+    assert check(1) == 1
+    with pytest.raises(mod.ReturnEarly):
+        check(None)
+    with pytest.raises(ValueError):
+        check(-1)
+    assert check.check(-1).error.args == ('negative', 'negative')
+
+
+def test_make_chain_with_checks(func):
+    """
+    Given a chain of checkable validators, when the chain is called, then
+    STOP causes the chain to return the original value, and errors are
+    raised without calling the remaining validators.
+    """
+    z = func(side_effect=lambda v: v)
+    cz = mod.chainable(z)
+    stop = mod.checkable(lambda v: mod.STOP if v is None else v)
+    fail = mod.checkable(
+        lambda v: mod.Invalid(ValueError('bad')) if v == 2 else v)
+    chain = mod.make_chain([stop, fail, cz])
+    assert chain(None) is None
+    assert chain(1) == 1
+    with pytest.raises(ValueError):
+        chain(2)
+    assert z.call_count == 1
+
+
+def test_make_chain_check(chainable_func):
+    """
+    Given a chain, when its check attribute is called, then errors are
+    returned instead of raised, both for checkable and other validators.
+    """
+    x, cx = chainable_func()
+    x.side_effect = ValueError('bad', 'bad')
+    fail = mod.checkable(lambda v: mod.invalid('neg', 'neg') if v < 0 else v)
+    chain = mod.make_chain([fail, cx])
+    ret = chain.check(1)
+    assert isinstance(ret, mod.Invalid)
+    assert ret.error.args == ('bad', 'bad')
+    ret = chain.check(-1)
+    assert ret.error.args == ('neg', 'neg')
+    assert x.call_count == 1
+
+
+def test_as_check(chainable_func):
+    """
+    Given a chainable validator, when as_check() is called with it, then it
+    returns a function that returns STOP or errors instead of raising them.
+    """
+    x, cx = chainable_func()
+    check = mod.as_check(cx)
+    assert check(1) == x.return_value
+    x.side_effect = mod.ReturnEarly
+    assert check(1) is mod.STOP
+    x.side_effect = ValueError
+    assert isinstance(check(1).error, ValueError)
+
+
+@pytest.mark.parametrize('value', [
+    KeyError('k'),
+    ValueError('x'),
+    mod.ValidationError('x', 'x'),
+])
+def test_make_chain_exception_value(value):
+    """
+    Given a value that is an exception, when it passes a chain, then it is
+    returned as the value, and not raised or reported as an error.
+    """
+    from validators.validators import required, instanceof
+
+    chain = mod.make_chain([required, instanceof(Exception)])
+    assert chain(value) is value
+    assert chain.check(value) is value
+    assert mod.make_check([required])(value) is value
+
+
+def test_make_chain_stats():
+    """
+    Given stats object, when chain is made with it and called, then calls,
+    times and failures of each link are recorded.
+    """
+    from validators.profiling import Stats
+    from validators.validators import required, istype, gte
+
+    stats = Stats()
+    chain = mod.make_chain([required, istype(int), gte(2)], stats=stats)
+    assert chain(3) == 3
+    with pytest.raises(ValueError):
+        chain(1)
+    with pytest.raises(ValueError):
+        chain('a')
+    assert sorted(stats.records) == ['0:required', '1:istype', '2:gte']
+    assert stats.records['0:required'].calls == 3
+    assert stats.records['1:istype'].failures == {'istype': 1}
+    assert stats.records['2:gte'].calls == 2
+    assert stats.records['2:gte'].failures == {'gte': 1}
+    rec = stats.records['0:required']
+    assert 0 <= rec.max <= rec.total
+
+
+def test_make_chain_stats_hook():
+    """
+    Given an object with record() method, when chain is made with it and
+    called, then record() is called for each link.
+    """
+    class Hook(object):
+        def __init__(self):
+            self.calls = []
+
+        def record(self, label, elapsed, result):
+            self.calls.append((label, result))
+
+    @mod.chainable
+    def fn(v):
+        return v
+
+    hook = Hook()
+    chain = mod.make_chain([fn], stats=hook, label='key/')
+    chain(1)
+    assert hook.calls == [('key/0:fn', 1)]
+
+
+def test_compose_shares_code():
+    """
+    Given two chains of the same length, when they are created, then their
+    checks share the same code object.
+    """
+    first = mod.make_chain([mod.chainable(lambda n: n)] * 2)
+    second = mod.make_chain([mod.chainable(lambda n: n + 1),
+                             mod.chainable(lambda n: n * 2)])
+    assert first.check.__code__ is second.check.__code__
+    assert second.check(1) == 4
@@ -0,0 +1,72 @@
+"""
+Tests for validators.columnar module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import numbers
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from validators.validators import required, instanceof, isin, gte, lte
+import validators.columnar as mod
+
+
+SPEC = {
+    'a': [required, instanceof(numbers.Integral), gte(0), lte(10)],
+    'b': [isin(['x', 'y'])],
+}
+
+
+@mock.patch.object(mod, 'load_numpy', return_value=None)
+def test_columnar_lists(*ignored):
+    """
+    Given a dict of lists, when the columnar validator is called, then it
+    returns a mask for each column and errors for each invalid row.
+    """
+    fn = mod.columnar_validator(SPEC)
+    ret = fn({'a': [1, 20, None, 3], 'b': ['x', 'y', 'z', 'x']})
+    assert ret.size == 4
+    assert ret.masks == {'a': [True, False, False, True],
+                         'b': [True, True, False, True]}
+    assert sorted(ret.errors) == [1, 2]
+    assert ret.errors[1]['a'].args[1] == 'lte'
+    assert sorted(ret.errors[2]) == ['a', 'b']
+    assert ret.valid == [True, False, False, True]
+
+
+def test_columnar_structured_array():
+    """
+    Given a NumPy structured array, when the columnar validator is called,
+    then the masks are NumPy arrays.
+    """
+    numpy = pytest.importorskip('numpy')
+    arr = numpy.array([(1, 'x'), (20, 'z'), (3, 'y')],
+                      dtype=[('a', 'i8'), ('b', 'U1')])
+    ret = mod.columnar_validator(SPEC)(arr)
+    assert ret.masks['a'].tolist() == [True, False, True]
+    assert ret.masks['b'].tolist() == [True, False, True]
+    assert ret.valid.tolist() == [True, False, True]
+    assert sorted(ret.errors[1]) == ['a', 'b']
+
+
+def test_columnar_length_mismatch():
+    fn = mod.columnar_validator(SPEC)
+    with pytest.raises(ValueError):
+        fn({'a': [1, 2], 'b': ['x']})
+
+
+def test_columnar_nested():
+    with pytest.raises(ValueError):
+        mod.columnar_validator({'a': {'b': [required]}})
+    with pytest.raises(ValueError):
+        mod.columnar_validator({'a': [{'b': [required]}]})
@@ -99,6 +99,22 @@ def test_spec_validator(chainable_func):
     y2.assert_called_once_with(x2.return_value)
 
 
+def test_spec_validator_exception_value():
+    """
+    Given a spec, when a valid value is an exception, then no error is
+    reported for it, also in OR() and NOT().
+    """
+    from validators.validators import instanceof, istype
+
+    fn = mod.spec_validator({
+        'e': [instanceof(Exception)],
+        'or': [mod.OR(istype(int), instanceof(Exception))],
+        'not': [mod.NOT(istype(int))],
+    })
+    err = ValueError('x')
+    assert fn({'e': err, 'or': err, 'not': err}) == {}
+
+
 def test_spec_validator_custom_getter(chainable_func):
     """
     Given a validation spec and a custom getter, when calling spec_validator()
@@ -150,3 +166,598 @@ def test_spec_validator_failure(chainable_func):
     assert 'bar' in ret
     assert 'foo' not in ret
     assert isinstance(ret['bar'], ValueError)
+
+
+@pytest.mark.parametrize('kwargs', [{'fail_fast': True}, {'max_errors': 1}])
+def test_spec_validator_fail_fast(chainable_func, kwargs):
+    """
+    Given a spec and fail_fast or max_errors option, when the validator is
+    called with an object with invalid data, then it stops validating keys
+    after the first error.
+    """
+    import collections
+
+    x1, cx1 = chainable_func()
+    x2, cx2 = chainable_func()
+    x3, cx3 = chainable_func()
+    x2.side_effect = ValueError
+    x3.side_effect = ValueError
+    spec = collections.OrderedDict([
+        ('foo', [cx1]),
+        ('bar', [cx2]),
+        ('baz', [cx3]),
+    ])
+    fn = mod.spec_validator(spec, **kwargs)
+    ret = fn({'foo': 1, 'bar': 2, 'baz': 3})
+    assert list(ret) == ['bar']
+    assert x1.called
+    assert not x3.called
+
+
+def test_spec_validator_max_errors(chainable_func):
+    """
+    Given a spec and max_errors option, when the validator is called with an
+    object with invalid data, then it returns at most max_errors errors.
+    """
+    import collections
+
+    funcs = [chainable_func() for _ in range(4)]
+    for x, _ in funcs:
+        x.side_effect = ValueError
+    spec = collections.OrderedDict(
+        (k, [cx]) for k, (_, cx) in zip('abcd', funcs))
+    fn = mod.spec_validator(spec, max_errors=2)
+    ret = fn(dict.fromkeys('abcd', 1))
+    assert sorted(ret) == ['a', 'b']
+    assert not funcs[2][0].called
+    assert sorted(mod.spec_validator(spec)(dict.fromkeys('abcd'))) == list(
+        'abcd')
+
+
+def test_spec_validator_max_errors_invalid():
+    """
+    Given max_errors lower than 1, when spec_validator() is called, then it
+    raises ValueError.
+    """
+    with pytest.raises(ValueError):
+        mod.spec_validator({}, max_errors=0)
+
+
+def test_spec_validator_nested():
+    """
+    Given a spec with nested specs, when the validator is called, then nested
+    keys are validated and errors are reported with dotted paths.
+    """
+    from validators.validators import required, istype
+
+    fn = mod.spec_validator({
+        'foo': [required],
+        'bar': {
+            'baz': [required, istype(int)],
+            'fam': {'qux': [required]},
+        },
+    })
+    assert fn({'foo': 1, 'bar': {'baz': 2, 'fam': {'qux': 3}}}) == {}
+    ret = fn({'foo': 1, 'bar': {'baz': 'a', 'fam': {'qux': None}}})
+    assert sorted(ret) == ['bar.baz', 'bar.fam.qux']
+    assert ret['bar.baz'].args[1] == 'istype'
+    ret = fn({'foo': 1, 'bar': None})
+    assert sorted(ret) == ['bar.baz', 'bar.fam.qux']
+
+
+def test_spec_validator_list_of_specs():
+    """
+    Given a spec with a key that maps to a list containing a nested spec,
+    when the validator is called, then each item of the list is validated and
+    errors are reported with item index in the path.
+    """
+    from validators.validators import required, gte
+
+    fn = mod.spec_validator({
+        'items': [{
+            'id': [required],
+            'tags': [{'n': [gte(0)]}],
+        }],
+    })
+    assert fn({'items': []}) == {}
+    assert fn({'items': None}) == {}
+    ret = fn({'items': [
+        {'id': 1, 'tags': [{'n': 1}]},
+        {'id': None, 'tags': [{'n': 1}, {'n': -1}]},
+    ]})
+    assert sorted(ret) == ['items.1.id', 'items.1.tags.1.n']
+
+
+def test_spec_validator_nested_mismatch():
+    """
+    Given a nested spec, when values do not have the shape of the spec, then
+    lists are reported as 'listof' errors, and items and intermediate values
+    that are not mappings are validated as None.
+    """
+    from validators.validators import required, istype
+
+    fn = mod.spec_validator({
+        'items': [{'id': [required, istype(int)]}],
+        'a': {'b': [required]},
+    })
+    valid = {'items': [{'id': 1}], 'a': {'b': 1}}
+    for items in [5, 'abc', {'id': 1}]:
+        ret = fn(dict(valid, items=items))
+        assert list(ret) == ['items']
+        assert ret['items'].args[1] == 'listof'
+    ret = fn(dict(valid, items=[None, 5]))
+    assert sorted(ret) == ['items.0.id', 'items.1.id']
+    assert ret['items.0.id'].args[1] == 'required'
+    for a in [5, 'abc', [1]]:
+        assert list(fn(dict(valid, a=a))) == ['a.b']
+
+
+def test_spec_validator_nested_max_errors():
+    """
+    Given a nested spec and max_errors, when the validator is called, then it
+    stops after max_errors errors across all levels.
+    """
+    from validators.validators import required
+
+    fn = mod.spec_validator({
+        'items': [{'id': [required]}],
+        'foo': [required],
+    }, max_errors=2)
+    ret = fn({'items': [{'id': None}] * 5, 'foo': None})
+    assert sorted(ret) == ['items.0.id', 'items.1.id']
+
+
+def test_compile_plan():
+    """
+    Given a nested spec, when compile_plan() is called, then it returns a
+    flat list of steps with dotted paths and getters that reach the nested
+    values.
+    """
+    plan = mod.compile_plan({'a': {'b': {'c': []}}, 'd': []},
+                            key=__import__('operator').itemgetter)
+    paths = sorted(path for path, _, _, _ in plan)
+    assert paths == ['a.b.c', 'd']
+    getter = [g for path, g, _, _ in plan if path == 'a.b.c'][0]
+    assert getter({'a': {'b': {'c': 1}}}) == 1
+    assert getter({'a': None}) is None
+
+
+def test_spec_validator_stats():
+    """
+    Given stats object, when spec validator is created with it and called,
+    then timing and failures of each key and link are recorded.
+    """
+    from validators.profiling import Stats
+    from validators.validators import required, istype
+
+    stats = Stats()
+    fn = mod.spec_validator({
+        'foo': [required, istype(int)],
+        'items': [{'id': [required]}],
+    }, stats=stats)
+    fn({'foo': 'a', 'items': [{'id': 1}, {'id': None}]})
+    assert sorted(stats.records) == [
+        'foo', 'foo/0:required', 'foo/1:istype', 'items.*.id',
+        'items.*.id/0:required']
+    assert stats.records['foo'].failures == {'istype': 1}
+    assert stats.records['items.*.id'].calls == 2
+    assert stats.records['items.*.id'].failures == {'required': 1}
+    assert 'foo/1:istype' in stats.report()
+    assert [label for label, _ in stats.top(2, by='calls')][0].startswith(
+        'items')
+
+
+def test_or_adaptive():
+    """
+    Given adaptive OR(), when it is called with values that mostly pass the
+    last function, then the last function is moved to the front.
+    """
+    from validators.validators import istype
+
+    fn = mod.OR(istype(str), istype(float), istype(int), adaptive=True,
+                interval=10)
+    assert fn.ranking.order == (0, 1, 2)
+    for i in range(8):
+        fn(i)
+    fn(1.0)
+    fn('a')
+    assert fn.ranking.order == (2, 0, 1)
+    assert fn(1.0) == 1.0
+
+
+def test_or_adaptive_error():
+    """
+    Given adaptive OR() that was reordered, when all functions fail, then the
+    error of the last function in the original order is raised.
+    """
+    from validators.validators import istype
+
+    fn = mod.OR(istype(str), istype(int), adaptive=True, interval=1)
+    fn(1)
+    fn(1)
+    assert fn.ranking.order == (1, 0)
+    with pytest.raises(ValueError) as exc:
+        fn(1.0)
+    assert exc.value.args == ('value must be a int, was float', 'istype')
+
+
+def test_or_adaptive_warmup():
+    """
+    Given adaptive OR() with warmup, when it is called more than warmup
+    times, then the order is frozen.
+    """
+    from validators.validators import istype
+
+    fn = mod.OR(istype(str), istype(int), adaptive=True, interval=2,
+                warmup=2)
+    fn('a')
+    fn('a')
+    assert fn.ranking.frozen
+    for i in range(10):
+        fn(i)
+    assert fn.ranking.order == (0, 1)
+    assert fn.ranking.successes == [2, 0]
+
+
+def test_or_adaptive_freeze():
+    """
+    Given adaptive OR(), when freeze() is called, then the order is updated
+    and no longer changes.
+    """
+    from validators.validators import istype
+
+    fn = mod.OR(istype(str), istype(int), adaptive=True)
+    fn(1)
+    fn.freeze()
+    assert fn.ranking.order == (1, 0)
+    for i in range(200):
+        fn('a')
+    assert fn.ranking.order == (1, 0)
+
+
+def test_or_adaptive_in_chain():
+    """
+    Given adaptive OR() in a chain, when chain is called from multiple
+    threads, then results are correct.
+    """
+    import threading
+    from validators.chain import make_chain
+    from validators.validators import istype
+
+    chain = make_chain([mod.OR(istype(str), istype(int), adaptive=True,
+                               interval=3)])
+    failures = []
+
+    def run():
+        for i in range(500):
+            if chain(i) != i or chain.check(1.0) is None:
+                failures.append(i)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert failures == []
+    assert chain.check(1.0).error.args[1] == 'istype'
+
+
+def test_or_unknown_option():
+    """
+    When OR() is called with unknown keyword argument, then TypeError is
+    raised.
+    """
+    with pytest.raises(TypeError):
+        mod.OR(lambda v: v, lambda v: v, foo=1)
+
+
+def test_spec_validator_optimize():
+    """
+    Given a spec and optimize=True, when spec validator is called, then the
+    results are the same as without optimization.
+    """
+    from validators.validators import required, istype, gte, lte
+
+    spec = {
+        'foo': [required, istype(int), gte(0), lte(10), istype(int)],
+        'bar': {'baz': [gte(0), lte(5)]},
+        'items': [{'id': [required, required]}],
+    }
+    fn = mod.spec_validator(spec, optimize=True)
+    plain = mod.spec_validator(spec)
+    for data in [
+        {'foo': 1, 'bar': {'baz': 1}, 'items': [{'id': 1}]},
+        {'foo': 11, 'bar': {'baz': 6}, 'items': [{'id': None}]},
+    ]:
+        ret = fn(data)
+        expected = plain(data)
+        assert sorted(ret) == sorted(expected)
+        for k in ret:
+            assert ret[k].args == expected[k].args
+
+
+def test_pickle_helpers():
+    """
+    Given OR() and NOT() validators, when they are pickled and unpickled,
+    then the copies validate the same way.
+    """
+    import pickle
+    from validators.validators import istype
+
+    fn = pickle.loads(pickle.dumps(mod.OR(istype(str), istype(int))))
+    assert fn(1) == 1
+    with pytest.raises(ValueError):
+        fn(1.0)
+    fn = pickle.loads(pickle.dumps(mod.NOT(istype(str))))
+    assert fn(1) == 1
+    with pytest.raises(ValueError):
+        fn('a')
+    fn = pickle.loads(pickle.dumps(mod.OR(istype(str), istype(int),
+                                          adaptive=True, interval=5)))
+    assert fn.ranking.interval == 5
+    assert fn(1) == 1
+
+
+def test_pickle_spec():
+    """
+    Given a spec made of built-in validators, when it is pickled and
+    unpickled, then the validator built from the copy works the same way.
+    """
+    import pickle
+    from validators.validators import required, istype, gte, listof
+
+    spec = {
+        'a': [required, istype(int), gte(0)],
+        'b': [mod.OR(istype(str), istype(int)), listof(istype(int))],
+    }
+    copy = pickle.loads(pickle.dumps(spec))
+    data = {'a': -1, 'b': [1, 'x']}
+    expected = mod.spec_validator(spec)(data)
+    result = mod.spec_validator(copy)(data)
+    assert sorted(result) == sorted(expected) == ['a', 'b']
+    assert result['a'].args == expected['a'].args
+
+
+
+def counting_spec(calls):
+    from validators.chain import chainable
+    from validators.validators import required, istype
+
+    def count(k):
+        @chainable
+        def counter(v):
+            calls.append(k)
+            return v
+        return counter
+    return {
+        'a': [count('a'), required, istype(int)],
+        'b': [count('b'), istype(int)],
+        'c': {'d': [count('d'), required]},
+    }
+
+
+def test_incremental_changed():
+    """
+    Given an incremental validator, when it is called with changed keys, then
+    only the chains of those keys are run and errors are merged.
+    """
+    calls = []
+    fn = mod.IncrementalValidator(counting_spec(calls))
+    obj = {'a': 1, 'b': 'x', 'c': {'d': 1}}
+    assert sorted(fn(obj)) == ['b']
+    assert sorted(calls) == ['a', 'b', 'd']
+    del calls[:]
+    obj['b'] = 2
+    obj['c'] = {'d': None}
+    assert sorted(fn(obj, changed=['b', 'c', 'unknown'])) == ['c.d']
+    assert sorted(calls) == ['b', 'd']
+    del calls[:]
+    obj['a'] = None
+    assert sorted(fn(obj, changed=['a'])) == ['a', 'c.d']
+    assert calls == ['a']
+
+
+def test_incremental_diff():
+    """
+    Given an incremental validator, when it is called without changed keys,
+    then keys whose values differ from the previous call are revalidated.
+    """
+    calls = []
+    fn = mod.IncrementalValidator(counting_spec(calls))
+    obj = {'a': 1, 'b': 2, 'c': {'d': 1}}
+    assert fn(obj) == {}
+    del calls[:]
+    assert fn(dict(obj, c={'d': 1})) == {}
+    assert calls == []
+    ret = fn(dict(obj, b='x'))
+    assert sorted(ret) == ['b']
+    assert calls == ['b']
+    del calls[:]
+    assert fn(obj) == {}
+    assert calls == ['b']
+
+
+def test_incremental_reset():
+    """
+    Given an incremental validator, when it is reset, then all keys are
+    revalidated on the next call.
+    """
+    calls = []
+    fn = mod.IncrementalValidator(counting_spec(calls))
+    obj = {'a': 1, 'b': 2, 'c': {'d': 1}}
+    fn(obj)
+    fn.reset()
+    del calls[:]
+    fn(obj, changed=[])
+    assert sorted(calls) == ['a', 'b', 'd']
+
+
+def sleeping(seconds, fail=False):
+    import time
+    from validators.chain import chainable
+
+    @chainable
+    def sleep(v):
+        time.sleep(seconds)
+        if fail:
+            raise ValueError('slow failure', 'slow')
+        return v
+    return sleep
+
+
+def meeting(count, fail=False, timeout=5):
+    """ Return validators that pass only if ``count`` of them run at once
+
+    Each validator waits until all ``count`` validators are running, and
+    raises a 'timeout' error if they do not meet within ``timeout`` seconds.
+    """
+    import threading
+    from validators.chain import chainable
+
+    cond = threading.Condition()
+    state = {'running': 0}
+
+    def make(fail):
+        @chainable
+        def meet(v):
+            with cond:
+                state['running'] += 1
+                cond.notify_all()
+                while state['running'] < count:
+                    if not cond.wait(timeout) and state['running'] < count:
+                        raise ValueError('chains did not run concurrently',
+                                         'timeout')
+            if fail:
+                raise ValueError('slow failure', 'slow')
+            return v
+        return meet
+    return [make(fail and i == 0) for i in range(count)]
+
+
+def test_spec_validator_io_bound():
+    """
+    Given a spec with I/O-bound keys, when the validator is called, then the
+    chains of those keys run concurrently and errors are collected in the
+    same dict.
+    """
+    from validators.validators import required
+
+    fns = meeting(10, fail=True)
+    spec = dict(('k{}'.format(i), [fn]) for i, fn in enumerate(fns[1:-1]))
+    spec['bad'] = [fns[0]]
+    spec['nested'] = {'inline': [required], 'slow': [fns[-1]]}
+    io_bound = [k for k in spec if k != 'nested'] + ['nested.slow']
+    fn = mod.spec_validator(spec, io_bound=io_bound)
+    obj = dict((k, 1) for k in spec)
+    obj['nested'] = {'inline': None, 'slow': 1}
+    ret = fn(obj)
+    assert sorted(ret) == ['bad', 'nested.inline']
+    assert ret['bad'].args[1] == 'slow'
+
+
+def test_spec_validator_io_bound_executor():
+    """
+    Given an executor, when a validator with I/O-bound keys is called, then
+    their chains are submitted to the executor.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from validators.validators import required
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit = mock.Mock(wraps=executor.submit)
+    fn = mod.spec_validator({'a': [required], 'b': [required]},
+                            io_bound=['b'], executor=executor,
+                            fail_fast=True)
+    assert sorted(fn({'a': None, 'b': None})) == ['a']
+    assert fn({'a': 1, 'b': None}).keys() == set(['b'])
+    assert executor.submit.call_count == 2
+    executor.shutdown()
+
+
+def test_spec_validator_io_bound_missing_key():
+    """
+    Given I/O-bound keys, when the value of a later key cannot be read, then
+    the error is raised and no chains are submitted.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from validators.validators import required
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit = mock.Mock(wraps=executor.submit)
+    fn = mod.spec_validator({'a': [required], 'b': [required]},
+                            io_bound=['a', 'b'], executor=executor)
+    with pytest.raises(KeyError):
+        fn({'a': 1})
+    assert executor.submit.call_count == 0
+    executor.shutdown()
+
+
+def test_spec_validator_io_bound_unknown():
+    from validators.validators import required
+
+    with pytest.raises(ValueError):
+        mod.spec_validator({'a': [required]}, io_bound=['b'])
+    with pytest.raises(ValueError):
+        mod.spec_validator({'a': [{'b': [required]}]}, io_bound=['a'])
+
+
+def test_spec_validator_adaptive():
+    """
+    Given a spec where a later key is cheap and often fails, when an adaptive
+    fail-fast validator is used, then that key is moved first.
+    """
+    from validators.validators import required
+
+    fn = mod.spec_validator({
+        'slow': [sleeping(0.001)],
+        'cheap': [required],
+    }, fail_fast=True, adaptive=True, interval=10)
+    assert fn.ranking.paths == ['slow', 'cheap']
+    for _ in range(10):
+        assert list(fn({'slow': 1, 'cheap': None})) == ['cheap']
+    assert fn.ranking.paths == ['cheap', 'slow']
+    assert fn({'slow': 1, 'cheap': 1}) == {}
+
+
+def test_spec_validator_adaptive_warmup():
+    """
+    Given an adaptive validator with warmup, when it has been used warmup
+    times, then the order is frozen.
+    """
+    from validators.validators import required
+
+    fn = mod.spec_validator({'a': [required], 'b': [required]},
+                            max_errors=1, adaptive=True, interval=1,
+                            warmup=2)
+    fn({'a': 1, 'b': 1})
+    assert not fn.ranking.frozen
+    fn({'a': 1, 'b': 1})
+    assert fn.ranking.frozen
+    calls = fn.ranking.calls[:]
+    fn({'a': 1, 'b': None})
+    assert fn.ranking.calls == calls
+
+
+def test_spec_validator_adaptive_pin():
+    """
+    Given an adaptive validator, when pin() is called, then the keys are
+    validated in the pinned order.
+    """
+    from validators.validators import required
+
+    fn = mod.spec_validator({'a': [required], 'b': [required],
+                             'c': {'d': [required]}},
+                            fail_fast=True, adaptive=True, interval=1)
+    fn.ranking.pin(['c.d', 'b'])
+    assert fn.ranking.frozen
+    assert fn.ranking.paths == ['c.d', 'b', 'a']
+    assert list(fn({'a': None, 'b': None, 'c': {'d': None}})) == ['c.d']
+    with pytest.raises(ValueError):
+        fn.ranking.pin(['x'])
+
+
+def test_spec_validator_adaptive_requires_max_errors():
+    from validators.validators import required
+
+    with pytest.raises(ValueError):
+        mod.spec_validator({'a': [required]}, adaptive=True)
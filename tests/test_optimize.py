@@ -0,0 +1,185 @@
+"""
+Tests for validators.optimize module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import re
+
+import pytest
+
+import validators.optimize as mod
+from validators.chain import chainable, make_chain, Validator, invalid
+from validators.validators import (required, optional, istype, instanceof,
+                                   isin, gte, lte, match, timestamp, url)
+
+
+def codes(fns):
+    return [getattr(fn, 'code', None) for fn in fns]
+
+
+def test_drop_duplicates():
+    """
+    Given a chain with duplicate built-in validators, when optimize() is
+    called, then the duplicates are removed.
+    """
+    fns = [required, istype(int), isin([1, 2]), required, istype(int),
+           isin([1, 2])]
+    assert codes(mod.optimize(fns)) == ['required', 'istype', 'isin']
+
+
+def test_drop_implied_instanceof():
+    """
+    Given istype() followed by instanceof() of a base class, when optimize()
+    is called, then instanceof() is removed.
+    """
+    fns = [istype(bool), instanceof(int), instanceof(str)]
+    assert codes(mod.optimize(fns)) == ['istype', 'instanceof']
+    assert mod.optimize(fns)[1].params == (str,)
+
+
+def test_keep_duplicates_across_opaque():
+    """
+    Given duplicate validators separated by a validator that is not a
+    built-in, when optimize() is called, then duplicates are kept.
+    """
+    fns = [istype(int), chainable(str), istype(int)]
+    assert codes(mod.optimize(fns)) == ['istype', None, 'istype']
+
+
+class ToInt(Validator):
+    """ Application validator that has a code and converts the value """
+
+    code = 'toint'
+
+    def check(self, v):
+        try:
+            return int(v)
+        except (TypeError, ValueError):
+            return invalid('not an integer', 'toint')
+
+
+class FakeMatch(ToInt):
+    code = 'match'
+
+
+@pytest.mark.parametrize('converter', [ToInt(), FakeMatch()])
+def test_application_validator_with_code(converter):
+    """
+    Given an application validator that has a code, when optimize() is
+    called, then validators are not moved across it.
+    """
+    fns = [match(re.compile(r'^\d+$')), converter, istype(int)]
+    assert mod.optimize(fns) == fns
+    assert make_chain(mod.optimize(fns))('12') == 12
+    assert mod.dump(fns).splitlines()[1].endswith('(opaque)')
+
+
+def test_keep_different_params():
+    fns = [gte(1), gte(2)]
+    assert codes(mod.optimize(fns)) == ['gte', 'gte']
+
+
+def test_move_type_checks():
+    """
+    Given a type check after an expensive validator, when optimize() is
+    called, then the type check is moved before it, but not across
+    optional().
+    """
+    fns = [required, timestamp('%Y'), istype(str)]
+    assert codes(mod.optimize(fns)) == ['required', 'istype', 'timestamp']
+    fns = [timestamp('%Y'), optional(), istype(str)]
+    assert codes(mod.optimize(fns)) == ['timestamp', 'optional', 'istype']
+
+
+@pytest.mark.parametrize('fns', [
+    [gte(0), lte(10)],
+    [lte(10), gte(0)],
+])
+def test_fuse_range(fns):
+    """
+    Given adjacent gte() and lte(), when optimize() is called, then they are
+    fused into a range check which raises the same errors.
+    """
+    optimized = mod.optimize(fns)
+    assert codes(optimized) == ['range']
+    assert optimized[0].params == (0, 10)
+    chain = make_chain(optimized)
+    original = make_chain(fns)
+    for v in [-1, 0, 5, 10, 11]:
+        result, expected = chain.check(v), original.check(v)
+        assert result.__class__ is expected.__class__
+        assert str(getattr(result, 'error', result)) == str(
+            getattr(expected, 'error', expected))
+
+
+def test_fuse_range_type_error():
+    """
+    Given fused range check, when it is called with value that cannot be
+    compared, then TypeError is raised as before.
+    """
+    chain = make_chain(mod.optimize([gte(0), lte(10)]))
+    with pytest.raises(TypeError):
+        chain('a')
+
+
+def test_fuse_match():
+    """
+    Given adjacent match() validators, when optimize() is called, then they
+    are fused into a single validator.
+    """
+    fns = [match(re.compile(r'a')), match(re.compile(r'.b'))]
+    optimized = mod.optimize(fns)
+    assert codes(optimized) == ['match_all']
+    chain = make_chain(optimized)
+    assert chain('ab') == 'ab'
+    assert chain.check('aa').error.args[1] == 'match'
+    assert chain.check(1).error.args[1] == 'match'
+
+
+def test_optimized_many():
+    """
+    Given chain with fused range check, when many() is called, then values
+    are validated.
+    """
+    chain = make_chain(mod.optimize([required, gte(0), lte(10)]))
+    assert chain.many.simple
+    results, errors = chain.many([1, 11, None])
+    assert [i for i, _ in errors] == [1, 2]
+
+
+def test_dump():
+    """
+    Given a chain, when dump() is called, then it returns one line for each
+    validator.
+    """
+    @chainable
+    def custom(v):
+        return v
+
+    chain = make_chain(mod.optimize([required, gte(0), lte(10), url, custom]))
+    assert mod.dump(chain) == '\n'.join([
+        '0: required',
+        '1: range(0, 10)',
+        '2: url',
+        '3: custom (opaque)',
+    ])
+
+
+def test_pickle_fused():
+    """
+    Given fused validators, when they are pickled and unpickled, then the
+    copies validate the same way.
+    """
+    import pickle
+
+    fns = mod.optimize([gte(0), lte(10), match(re.compile('a')),
+                        match(re.compile('.b'))])
+    copies = pickle.loads(pickle.dumps(fns))
+    assert mod.dump(copies) == mod.dump(fns)
+    assert copies[0].check(11).error.args == fns[0].check(11).error.args
+    assert copies[1].check('ab') == 'ab'
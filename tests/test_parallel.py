@@ -0,0 +1,68 @@
+"""
+Tests for validators.parallel module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from validators.validators import required, istype, gte, isin
+import validators.parallel as mod
+
+
+def make_spec():
+    return {
+        'foo': [required, istype(int), gte(0)],
+        'bar': [isin(['a', 'b'])],
+    }
+
+
+def make_records(n):
+    for i in range(n):
+        yield {'foo': i - 5 if i % 7 else None, 'bar': 'a' if i % 3 else 'c'}
+
+
+def test_chunks():
+    """
+    Given an iterable, when chunks() is called, then it yields lists of given
+    size with index of the first item.
+    """
+    ret = list(mod.chunks(iter(range(5)), 2))
+    assert ret == [(0, [0, 1]), (2, [2, 3]), (4, [4])]
+
+
+def test_validate_parallel():
+    """
+    Given a spec with closures and a list of records, when
+    validate_parallel() is called, then it returns errors for invalid records
+    keyed by record index.
+    """
+    records = list(make_records(100))
+    validator = mod.spec_validator(make_spec())
+    expected = {}
+    for i, record in enumerate(records):
+        errors = validator(record)
+        if errors:
+            expected[i] = errors
+    ret = mod.validate_parallel(make_spec(), records, processes=2,
+                                chunksize=7)
+    assert sorted(ret) == sorted(expected)
+    for i in ret:
+        assert sorted(ret[i]) == sorted(expected[i])
+        assert all(isinstance(e, ValueError) for e in ret[i].values())
+
+
+def test_validate_parallel_spec_factory():
+    """
+    Given a function that returns the spec and an iterator of records, when
+    validate_parallel() is called, then records are validated against the
+    spec returned by the function.
+    """
+    ret = mod.validate_parallel(make_spec, make_records(30), processes=2,
+                                chunksize=4)
+    assert sorted(ret[0]) == ['bar', 'foo']
+    assert sorted(ret[1]) == ['foo']
+    assert 5 not in ret
+    assert sorted(ret[6]) == ['bar']
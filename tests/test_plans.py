@@ -0,0 +1,151 @@
+"""
+Tests for validators.plans module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import re
+import pickle
+
+import pytest
+
+import validators.plans as mod
+from validators.chain import make_chain
+from validators.validators import required, istype, isin, match, gte, listof
+
+
+def make_spec(n=2):
+    return {
+        'a': [required, istype(int), gte(n)],
+        'b': [isin(set(['x', 'y'])), match(re.compile(r'[a-z]$', re.I))],
+        'c': {'d': [required]},
+    }
+
+
+def test_fingerprint():
+    """
+    Given two equal specs, then their fingerprints are equal, and when
+    parameters differ, then fingerprints differ.
+    """
+    assert mod.spec_fingerprint(make_spec()) == mod.spec_fingerprint(
+        make_spec())
+    assert mod.spec_fingerprint(make_spec(1)) != mod.spec_fingerprint(
+        make_spec(2))
+    assert mod.spec_fingerprint({'a': [required]}) != mod.spec_fingerprint(
+        {'a': [istype(int)]})
+    assert mod.spec_fingerprint(
+        {'a': [listof(make_chain([gte(0)]))]}) != mod.spec_fingerprint(
+        {'a': [listof(make_chain([gte(5)]))]})
+
+
+def test_save_and_load(tmpdir):
+    """
+    Given a saved plan, when it is loaded with the same fingerprint, then
+    the loaded validator works as the original.
+    """
+    path = str(tmpdir.join('plan'))
+    validator = mod.save_plan(path, make_spec(), 'v1', fail_fast=True)
+    loaded = mod.load_plan(path, 'v1', fail_fast=True)
+    assert loaded is not None
+    data = {'a': 1, 'b': 'x', 'c': {'d': 1}}
+    assert sorted(loaded(data)) == sorted(validator(data)) == ['a']
+    assert loaded({'a': 3, 'b': 'x', 'c': {'d': None}}).keys() == set(
+        ['c.d'])
+
+
+def test_load_compiled_regex(tmpdir, monkeypatch):
+    """
+    Given a saved plan with regexes, when it is loaded, then the regexes are
+    not compiled again.
+    """
+    path = str(tmpdir.join('plan'))
+    mod.save_plan(path, {'a': [match(re.compile(r'(?P<x>[a-z])+$', re.I))]},
+                  'v1')
+
+    def compile(*args, **kwargs):
+        raise AssertionError('regex compiled')
+
+    monkeypatch.setattr(mod.re, 'compile', compile)
+    loaded = mod.load_plan(path, 'v1')
+    assert loaded({'a': 'aBc'}) == {}
+    assert list(loaded({'a': 'a1'})) == ['a']
+
+
+def test_regex_fallback():
+    """
+    Given a saved regex whose code cannot be used, when it is loaded, then it
+    is compiled from the pattern.
+    """
+    regex = mod.compiled_regex('a+', 0, (0, [], 0, {}, ()))
+    assert regex.match('aa') and regex.pattern == 'a+'
+
+
+@pytest.mark.parametrize('args,kwargs', [
+    (('v2',), {'fail_fast': True}),
+    (('v1',), {}),
+    (('v1',), {'fail_fast': True, 'key': lambda k: k}),
+])
+def test_load_stale(tmpdir, args, kwargs):
+    """
+    Given a saved plan, when it is loaded with a different fingerprint or
+    options, then None is returned.
+    """
+    path = str(tmpdir.join('plan'))
+    mod.save_plan(path, make_spec(), 'v1', fail_fast=True)
+    assert mod.load_plan(path, *args, **kwargs) is None
+
+
+def test_load_missing(tmpdir):
+    assert mod.load_plan(str(tmpdir.join('missing')), 'v1') is None
+    path = tmpdir.join('corrupt')
+    path.write('garbage')
+    assert mod.load_plan(str(path), 'v1') is None
+
+
+def test_cached_spec_validator(tmpdir):
+    """
+    Given a spec factory and a fingerprint, when cached_spec_validator() is
+    called the second time, then the factory is not called.
+    """
+    path = str(tmpdir.join('plan'))
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return make_spec()
+
+    first = mod.cached_spec_validator(path, factory, 'v1')
+    second = mod.cached_spec_validator(path, factory, 'v1')
+    assert len(calls) == 1
+    data = {'a': 1, 'b': 'z', 'c': {'d': 1}}
+    assert sorted(first(data)) == sorted(second(data)) == ['a', 'b']
+
+
+def test_cached_spec_validator_fingerprint(tmpdir):
+    """
+    Given a spec without fingerprint, when cached_spec_validator() is called
+    with a changed spec, then the plan is rebuilt.
+    """
+    path = str(tmpdir.join('plan'))
+    mod.cached_spec_validator(path, make_spec(1))
+    validator = mod.cached_spec_validator(path, make_spec(5))
+    assert sorted(validator({'a': 3, 'b': 'x', 'c': {'d': 1}})) == ['a']
+
+
+def test_unpicklable_spec(tmpdir):
+    """
+    Given a spec that cannot be pickled, when cached_spec_validator() is
+    called, then the built validator is returned, and no file is left
+    behind.
+    """
+    spec = {'a': [listof(make_chain([gte(0)]))]}
+    validator = mod.cached_spec_validator(str(tmpdir.join('plan')), spec)
+    assert list(validator({'a': [1, -1]})) == ['a']
+    assert tmpdir.listdir() == []
+    with pytest.raises((pickle.PicklingError, AttributeError, TypeError)):
+        mod.save_plan(str(tmpdir.join('plan')), spec)
+    assert tmpdir.listdir() == []
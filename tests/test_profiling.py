@@ -0,0 +1,59 @@
+"""
+Tests for validators.profiling module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import validators.profiling as mod
+from validators.chain import Invalid, invalid
+
+
+def test_record():
+    """
+    When record() is called, then calls, total and max time, and failures
+    by code are updated.
+    """
+    stats = mod.Stats()
+    stats.record('a', 0.5, 1)
+    stats.record('a', 1.5, invalid('bad', 'bad'))
+    stats.record('a', 1.0, Invalid(ValueError('bad', 'other')))
+    stats.record('a', 1.0, Invalid(ValueError('bad')))
+    rec = stats.records['a']
+    assert rec.calls == 4
+    assert rec.total == 4.0
+    assert rec.max == 1.5
+    assert rec.mean == 1.0
+    assert rec.failures == {'bad': 1, 'other': 1, None: 1}
+
+
+def test_top_and_clear():
+    """
+    Given recorded stats, when top() is called, then labels are sorted by
+    the specified attribute. When clear() is called, all records are removed.
+    """
+    stats = mod.Stats()
+    stats.record('a', 1.0, 1)
+    stats.record('b', 2.0, 1)
+    stats.record('a', 2.0, 1)
+    assert [label for label, _ in stats.top()] == ['a', 'b']
+    assert [label for label, _ in stats.top(1, by='max')] == ['a']
+    assert [label for label, _ in stats.top(by='mean')] == ['b', 'a']
+    stats.clear()
+    assert stats.records == {}
+
+
+def test_report():
+    """
+    Given recorded stats, when report() is called, then it returns a table
+    with one line per label.
+    """
+    stats = mod.Stats()
+    stats.record('a', 0.001, invalid('bad', 'bad'))
+    lines = stats.report().splitlines()
+    assert len(lines) == 2
+    assert lines[1].startswith('a ')
+    assert lines[1].endswith('bad=1')
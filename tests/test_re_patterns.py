@@ -0,0 +1,92 @@
+"""
+Tests for validators.re_patterns module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import re
+
+import pytest
+
+import validators
+import validators.re_patterns as mod
+
+
+def test_lazy_pattern():
+    """
+    Given a lazy pattern, when its attributes are accessed, then the pattern
+    is compiled once and behaves as the compiled pattern.
+    """
+    pattern = mod.LazyPattern(r'(?i)foo$')
+    assert pattern._compiled is None
+    assert pattern.match('FOO')
+    assert not pattern.match('bar')
+    assert pattern._compiled is pattern.compile()
+    assert pattern.pattern == r'(?i)foo$'
+    assert pattern.flags & re.IGNORECASE
+
+
+def test_lazy_pattern_private():
+    """
+    Given a lazy pattern, when private attribute is accessed, then the
+    pattern is not compiled.
+    """
+    pattern = mod.LazyPattern(r'foo')
+    with pytest.raises(AttributeError):
+        pattern.__foo__
+    assert pattern._compiled is None
+
+
+def test_package_exports():
+    """
+    Given the package, when exported names are accessed, then they are the
+    objects defined in submodules, and unknown names raise AttributeError.
+    """
+    from validators.helpers import spec_validator
+    assert validators.spec_validator is spec_validator
+    for name in validators.__all__:
+        assert getattr(validators, name) is not None
+    with pytest.raises(AttributeError):
+        validators.does_not_exist
+
+
+def test_package_submodules():
+    """
+    Given a fresh interpreter, when submodules are accessed as attributes of
+    the imported package, then they are imported.
+    """
+    import os
+    import sys
+    import subprocess
+
+    code = ('import validators\n'
+            'print(validators.helpers.spec_validator.__name__,\n'
+            '      validators.chain.make_chain.__name__)\n'
+            'try:\n'
+            '    validators.no_such_module\n'
+            'except AttributeError:\n'
+            '    print("missing")\n')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    assert out.split() == [b'spec_validator', b'make_chain', b'missing']
+
+
+def test_bytes_pattern():
+    """
+    Given a text pattern, when bytes_pattern() is called with it, then it
+    returns a lazy bytes pattern with the same flags, without compiling the
+    original lazy pattern.
+    """
+    lazy = mod.LazyPattern(r'(?i)foo\d$')
+    pattern = mod.bytes_pattern(lazy)
+    assert lazy._compiled is None
+    assert pattern.match(b'FOO1')
+    compiled = mod.bytes_pattern(re.compile(r'foo', re.I))
+    assert compiled.match(b'FOO')
+    assert mod.bytes_pattern(compiled) is compiled
+    assert mod.bytes_pattern(re.compile(u'f\xf6o')) is None
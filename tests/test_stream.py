@@ -0,0 +1,156 @@
+"""
+Tests for validators.stream module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import io
+import json
+import types
+
+import pytest
+
+from validators.helpers import spec_validator
+from validators.validators import required, istype, isin
+import validators.stream as mod
+
+
+JSONL = u'{"foo": 1, "bar": "a"}\n\n{"foo": null, "bar": "a"}\n' \
+    u'{"foo": 2, "bar": "c"}\n'
+
+CSV = u'foo,bar\n1,a\n,a\n2,c\n'
+
+
+@pytest.fixture
+def validator():
+    return spec_validator({
+        'foo': [required],
+        'bar': [isin(['a', 'b'])],
+    })
+
+
+def test_validate_stream_jsonl(validator):
+    """
+    Given a file object with JSON Lines, when validate_stream() is called,
+    then it returns a generator that yields line numbers, records and errors.
+    """
+    ret = mod.validate_stream(validator, io.StringIO(JSONL))
+    assert isinstance(ret, types.GeneratorType)
+    ret = list(ret)
+    assert [line_no for line_no, _, _ in ret] == [1, 3, 4]
+    assert ret[0][1] == {'foo': 1, 'bar': 'a'}
+    assert [sorted(errors) for _, _, errors in ret] == [[], ['foo'], ['bar']]
+
+
+def test_validate_stream_csv():
+    """
+    Given a file object with CSV rows, when validate_stream() is called with
+    csv format, then rows are validated as dicts keyed by header fields.
+    """
+    validator = spec_validator({
+        'foo': [istype(str), isin(['1', '2'])],
+        'bar': [isin(['a', 'b'])],
+    })
+    ret = list(mod.validate_stream(validator, io.StringIO(CSV),
+                                   format='csv'))
+    assert [line_no for line_no, _, _ in ret] == [2, 3, 4]
+    assert ret[0][1] == {'foo': '1', 'bar': 'a'}
+    assert [sorted(errors) for _, _, errors in ret] == [[], ['foo'], ['bar']]
+
+
+def test_validate_stream_path(validator, tmpdir):
+    """
+    Given a path, when validate_stream() is called with it, then the file is
+    opened, read and closed when the generator is exhausted.
+    """
+    path = tmpdir.join('data.jsonl')
+    path.write_text(JSONL, encoding='utf8')
+    ret = list(mod.validate_stream(validator, str(path)))
+    assert len(ret) == 3
+
+
+def test_validate_stream_lazy(validator):
+    """
+    Given a file object, when records are requested one by one, then the file
+    is read only as far as necessary.
+    """
+    f = io.StringIO(JSONL)
+    ret = mod.validate_stream(validator, f)
+    next(ret)
+    assert f.tell() < len(JSONL)
+
+
+@pytest.mark.parametrize('fmt,data', [('jsonl', JSONL), ('csv', CSV)])
+def test_validate_stream_sink(validator, fmt, data):
+    """
+    Given a sink, when validate_stream() is called, then records that fail to
+    validate are written to the sink in the source format.
+    """
+    sink = io.StringIO()
+    list(mod.validate_stream(validator, io.StringIO(data), format=fmt,
+                             sink=sink))
+    if fmt == 'jsonl':
+        lines = sink.getvalue().splitlines()
+        assert [json.loads(l) for l in lines] == [
+            {'foo': None, 'bar': 'a'}, {'foo': 2, 'bar': 'c'}]
+    else:
+        assert sink.getvalue().splitlines() == ['foo,bar', '2,c']
+
+
+def test_validate_stream_unknown_format(validator):
+    """
+    Given an unknown format, when validate_stream() is called, then it raises
+    ValueError.
+    """
+    with pytest.raises(ValueError):
+        list(mod.validate_stream(validator, io.StringIO(''), format='xml'))
+
+
+def test_validate_stream_malformed(validator):
+    """
+    Given JSON Lines with a malformed line, when validate_stream() is called,
+    then the line is reported as an error and written to the sink, and the
+    following records are validated.
+    """
+    data = u'{"foo": 1, "bar": "a"}\n{"foo": \n{"foo": null, "bar": "a"}\n'
+    sink = io.StringIO()
+    ret = list(mod.validate_stream(validator, io.StringIO(data), sink=sink))
+    assert [line_no for line_no, _, _ in ret] == [1, 2, 3]
+    _, record, errors = ret[1]
+    assert isinstance(record, mod.MalformedRecord)
+    assert list(errors) == [mod.RECORD_KEY]
+    assert errors[mod.RECORD_KEY].args[1] == 'malformed'
+    assert sorted(ret[2][2]) == ['foo']
+    assert sink.getvalue().splitlines() == [
+        '{"foo": ', '{"foo": null, "bar": "a"}']
+
+
+def test_validate_stream_not_object(validator):
+    """
+    Given JSON Lines with lines that are valid JSON but not objects, when
+    validate_stream() is called, then the lines are reported as malformed.
+    """
+    data = u'[1, 2]\n"x"\n{"foo": 1, "bar": "a"}\n'
+    ret = list(mod.validate_stream(validator, io.StringIO(data)))
+    assert [isinstance(r, mod.MalformedRecord) for _, r, _ in ret] == [
+        True, True, False]
+    assert ret[0][2][mod.RECORD_KEY].args[1] == 'malformed'
+    assert ret[2][2] == {}
+
+
+@pytest.mark.parametrize('fmtparams', [{}, {'restkey': 'rest'}])
+def test_validate_stream_csv_extra_fields(validator, fmtparams):
+    """
+    Given CSV rows with more fields than the header, when validate_stream()
+    is called with a sink, then the rows are written with all fields.
+    """
+    data = u'foo,bar\n1,c,x,y\n1,a\n'
+    sink = io.StringIO()
+    ret = list(mod.validate_stream(validator, io.StringIO(data),
+                                   format='csv', sink=sink, **fmtparams))
+    assert [sorted(errors) for _, _, errors in ret] == [['bar'], []]
+    assert sink.getvalue().splitlines() == ['foo,bar', '1,c,x,y']
@@ -0,0 +1,101 @@
+"""
+Tests for validators.timestamps module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import sys
+import datetime
+
+import pytest
+
+import validators.timestamps as mod
+
+
+def strptime_matches(s, fmt):
+    try:
+        datetime.datetime.strptime(s, fmt)
+    except ValueError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize('fmt', [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y%m%d %%',
+    '(%Y)',
+])
+def test_compile_pattern(fmt):
+    """
+    Given a format with supported directives, when compile_pattern() is
+    called, then it returns a regex pattern.
+    """
+    assert mod.compile_pattern(fmt) is not None
+
+
+@pytest.mark.parametrize('fmt', [
+    '%b %d',
+    '%Y %Y',
+    '%Y%',
+])
+def test_compile_pattern_unsupported(fmt):
+    """
+    Given a format with unsupported or repeated directives, when
+    compile_pattern() is called, then it returns None.
+    """
+    assert mod.compile_pattern(fmt) is None
+
+
+@pytest.mark.parametrize('x', [
+    ('2015-04-29', '%Y-%m-%d'),
+    ('2015-4-9', '%Y-%m-%d'),
+    ('2016-02-29', '%Y-%m-%d'),
+    ('2015-02-29', '%Y-%m-%d'),
+    ('0000-01-01', '%Y-%m-%d'),
+    ('02-29', '%m-%d'),
+    (' 9', '%d'),
+    ('2015-04-29 17:00:01', '%Y-%m-%d %H:%M:%S'),
+    ('2015-04-29  17:00:01', '%Y-%m-%d %H:%M:%S'),
+    ('2015-04-29 17:00:60', '%Y-%m-%d %H:%M:%S'),
+    ('2015-04-29 17:00:01 ', '%Y-%m-%d %H:%M:%S'),
+    ('2015-04-29T17:00:01.123456', '%Y-%m-%dT%H:%M:%S.%f'),
+    ('2015-04-29t17:00:01.1234567', '%Y-%m-%dT%H:%M:%S.%f'),
+    ('20150429170001', '%Y%m%d%H%M%S'),
+    ('2015 %', '%Y %%'),
+    ('Apr 29', '%b %d'),
+    ('Foo 29', '%b %d'),
+])
+def test_compile_format(x):
+    """
+    Given a string and a format, when compile_format() is called with the
+    format, then the returned function matches the string if and only if
+    strptime() can parse it.
+    """
+    s, fmt = x
+    assert mod.compile_format(fmt)(s) == strptime_matches(s, fmt)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='%z with colons requires Python 3.7')
+@pytest.mark.parametrize('s', [
+    '+0100',
+    '-01:30',
+    '+01:30:45.5',
+    '+0130:45',
+    '+01:3045',
+    '+2400',
+    '+2359',
+    'Z',
+    'z',
+])
+def test_compile_format_offset(s):
+    """
+    Given a UTC offset, when compile_format() is called with %z, then the
+    returned function matches the offset if and only if strptime() can parse
+    it.
+    """
+    assert mod.compile_format('%z')(s) == strptime_matches(s, '%z')
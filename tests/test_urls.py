@@ -0,0 +1,118 @@
+"""
+Tests for validators.urls module
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import pytest
+
+from validators.re_patterns import URL_RE, URL_BYTES_RE
+import validators.urls as mod
+
+
+@pytest.mark.parametrize('s', [
+    'http://www.example.com/',
+    'http://example.com',
+    'HTTP://EXAMPLE.COM/',
+    'http://123.456.789.012/',
+    'http://localhost/',
+    'http://localhost:8080',
+    'outernet://user.outernet/',
+    'http://example.com:1234/',
+    'http://example.com/foo/bar?baz=1',
+    'http://example.com?baz',
+    'http://example.com.',
+    'http://example.com.:80/',
+    'http://a.-b-/',
+    'http://a-b.c-d.e/',
+    'http://example.com\n',
+    'http://' + 'a' * 63 + '.com',
+    'http://' + 'a' * 64 + '.com',
+    'http://-a.com',
+    'http://a-.com',
+    'http://a..com',
+    'http://.com',
+    'http://a.c',
+    'http://example.com:/',
+    'http://example.com?',
+    'http://example.com/ x',
+    'http://example.com/\n\n',
+    'http:/example.com',
+    '://example.com',
+    'http://1.2.3',
+    'http://1.2.3.4444',
+    'this is an invalid URL',
+    '',
+])
+def test_is_url(s):
+    """
+    Given a string, when is_url() is called with it, then it returns True if
+    and only if the string matches URL_RE.
+    """
+    assert mod.is_url(s) == bool(URL_RE.match(s))
+
+
+@pytest.mark.parametrize('v', [None, 1, [b'http://example.com/']])
+def test_is_url_non_string(v):
+    """
+    Given a value that is not a string, when is_url() is called with it, then
+    it returns False.
+    """
+    assert mod.is_url(v) is False
+
+
+@pytest.mark.parametrize('s', [
+    'http://' + 'a' * 100000 + '!',
+    'http://' + 'a.' * 50000 + '!',
+    'http://' + ('a' * 62 + '.') * 2000 + ' ',
+    'http://a.' + 'b' * 100000 + '/ x',
+])
+def test_is_url_hostile(s):
+    """
+    Given a long crafted string, when is_url() is called with it, then it
+    returns the same result as URL_RE.
+    """
+    assert mod.is_url(s) == bool(URL_RE.match(s))
+
+
+@pytest.mark.parametrize('s', [
+    'http://www.example.com/',
+    'http://localhost:8080/foo?bar',
+    'http://123.456.789.012/',
+    'http://example.com/foo bar',
+    'http://exa_mple.com/',
+    'foo',
+])
+def test_is_url_bytes(s):
+    """
+    Given a bytes-like object, when is_url() is called with it, then it
+    returns the same result as for the string.
+    """
+    expected = mod.is_url(s)
+    data = s.encode('ascii')
+    assert bool(URL_BYTES_RE.match(data)) == expected
+    assert mod.is_url(data) == expected
+    assert mod.is_url(bytearray(data)) == expected
+    assert mod.is_url(memoryview(b'xx' + data)[2:]) == expected
+
+
+def test_is_url_mmap(tmpdir):
+    """
+    Given a memory-mapped file, when is_url() is called with a slice of its
+    memory view, then the slice is matched in place.
+    """
+    import mmap
+    path = tmpdir.join('data')
+    path.write(b'http://example.com/ http://exa_mple.com/', mode='wb')
+    with path.open('rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        assert mod.is_url(view[:19])
+        assert not mod.is_url(view[20:])
+        assert not mod.is_url(mapped)
+        view.release()
+        mapped.close()
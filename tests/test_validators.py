@@ -9,6 +9,8 @@ file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 """
 
 import re
+import array
+import types
 
 import pytest
 
@@ -287,6 +289,65 @@ def test_no_match():
         validator(s)
 
 
+@pytest.mark.parametrize('v', [
+    b'foobarbaz',
+    bytearray(b'foobarbaz'),
+    memoryview(b'xxfoobarbaz')[2:],
+])
+def test_match_bytes(v):
+    """
+    Given a text regex and a bytes-like object, when match() is called with
+    the object, then it is matched using a bytes version of the regex.
+    """
+    validator = mod.match(re.compile('^foo.*baz$'))
+    assert validator(v) is v
+    with pytest.raises(ValueError):
+        validator(v[1:])
+    assert validator.params == (validator.regex,)
+
+
+def test_match_bytes_non_ascii():
+    """
+    Given a regex with non-ASCII characters, when match() is called with a
+    bytes object, then it raises ValueError.
+    """
+    validator = mod.match(re.compile(u'^f\xf6o$'))
+    with pytest.raises(ValueError):
+        validator(b'foo')
+
+
+@pytest.mark.parametrize('pattern', [
+    r'\N{DIGIT ONE}',
+    r'\u0031',
+    r'(?u)1',
+])
+def test_match_bytes_invalid_pattern(pattern):
+    """
+    Given a text regex that is not valid as a bytes pattern, when match() is
+    called with a bytes object, then it raises ValueError.
+    """
+    validator = mod.match(re.compile(pattern))
+    assert validator('1') == '1'
+    with pytest.raises(ValueError) as exc:
+        validator(b'1')
+    assert exc.value.args[1] == 'match'
+
+
+def test_bytes_like_url_and_min_len():
+    """
+    Given bytes-like objects, when url(), bounded_url() and min_len() are
+    called with them, then they are validated as strings.
+    """
+    view = memoryview(b'http://example.com/ x')
+    assert mod.url(view[:19]) is not None
+    assert mod.bounded_url(19)(bytearray(b'http://example.com/'))
+    with pytest.raises(ValueError):
+        mod.bounded_url(18)(view[:19])
+    assert mod.min_len(2)(view[:2]) is not None
+    with pytest.raises(ValueError):
+        mod.min_len(2)(view[:1])
+
+
 @pytest.mark.parametrize('x', [
     'http://www.example.com/',
     'http://example.com/',
@@ -320,6 +381,33 @@ def test_invalid_url():
         mod.url('this is an invalid URL')
 
 
+@pytest.mark.parametrize('x', ['this is an invalid URL', None, 1])
+def test_invalid_url_in_chain(x):
+    """
+    Given an invalid URL, when a chain containing url is called with it, then
+    it raises ValueError with the url code.
+    """
+    chain = mod.chainable(lambda v: v)(mod.url(lambda v: v))
+    with pytest.raises(ValueError) as exc:
+        chain(x)
+    assert exc.value.args[1] == 'url'
+
+
+def test_bounded_url():
+    """
+    Given a maximum length, when bounded_url() is called with it, then it
+    returns a function that rejects URLs longer than the maximum length.
+    """
+    validator = mod.bounded_url(24)
+    assert validator('http://www.example.com/') == 'http://www.example.com/'
+    with pytest.raises(ValueError):
+        validator('http://www.example.com/foo')
+    with pytest.raises(ValueError):
+        validator('invalid')
+    with pytest.raises(ValueError):
+        validator(None)
+
+
 @pytest.mark.parametrize('x', [
     ('2015-04-29', '%Y-%m-%d'),
     ('2015-04-29 17:00:01', '%Y-%m-%d %H:%M:%S'),
@@ -372,3 +460,223 @@ def test_listof_invalid(x):
     validator = mod.listof(item_validator)
     with pytest.raises(ValueError):
         validator(value)
+
+
+@pytest.mark.parametrize('x', [
+    ([1, 'a'], mod.istype(int), 'value must be a int, was str'),
+    ([1, 2], mod.chainable(lambda v: mod.gte(2)(v)),
+     'value must be greater than 2'),
+])
+def test_listof_message(x):
+    (value, item_validator, message) = x
+    validator = mod.listof(item_validator)
+    with pytest.raises(ValueError) as exc:
+        validator(value)
+    assert exc.value.args == (
+        'List item validation failed with error: ' + message, 'listof')
+
+
+def test_listof_plain_value_error():
+    @mod.chainable
+    def item_validator(v):
+        raise ValueError('bad item', 'bad')
+
+    validator = mod.listof(item_validator)
+    with pytest.raises(ValueError) as exc:
+        validator([1])
+    assert exc.value.args == (
+        'List item validation failed with error: bad item', 'listof')
+
+
+@pytest.mark.parametrize('x', [
+    (mod.isin([1, 2]), 3, ('value must be in [1, 2]', 'isin')),
+    (mod.gte(2), 1, ('value must be greater than 2', 'gte')),
+    (mod.istype(int), 'a', ('value must be a int, was str', 'istype')),
+    (mod.nonempty, '', ("value cannot be an empty <class 'str'>",
+                        'nonempty')),
+    (mod.timestamp('%Y'), 'x', ("x does not match the format '%Y'",
+                                'timestamp')),
+])
+def test_error_args(x):
+    """
+    Given a built-in validator and invalid value, when the validator is
+    called with the value, then it raises ValidationError whose args are
+    the formatted message and the code.
+    """
+    validator, value, args = x
+    with pytest.raises(mod.ValidationError) as exc:
+        validator(value)
+    assert exc.value.args == args
+
+
+@pytest.mark.parametrize('value', [
+    (1, 2),
+    array.array('i', [1, 2]),
+    memoryview(b'\x01\x02'),
+])
+def test_listof_sequences(value):
+    """
+    Given a sequence other than a list, when listof() validator is called with
+    it, then the items are validated.
+    """
+    validator = mod.listof(mod.gte(1))
+    assert validator(value) is value
+    with pytest.raises(ValueError) as exc:
+        mod.listof(mod.gte(2))(value)
+    assert exc.value.args == (
+        'List item validation failed with error: value must be greater '
+        'than 2', 'listof')
+
+
+@pytest.mark.parametrize('value', [
+    'ab',
+    b'ab',
+    bytearray(b'ab'),
+    {'a': 1},
+    types.MappingProxyType({'a': 1}),
+])
+def test_listof_not_sequences(value):
+    """
+    Given text, bytes or a mapping, when listof() validator is called with
+    it, then it raises ValueError.
+    """
+    with pytest.raises(ValueError) as exc:
+        mod.listof(mod.optional())(value)
+    assert exc.value.args == ('Value must be a list.', 'listof')
+
+
+def test_listof_collect():
+    """
+    Given listof() validator created with collect=True, when it is called
+    with a list that has invalid items, then the error has indices and errors
+    of all invalid items.
+    """
+    validator = mod.listof(mod.istype(int), collect=True)
+    assert validator([1, 2]) == [1, 2]
+    with pytest.raises(mod.ValidationError) as exc:
+        validator([1, 'a', 2, None])
+    assert exc.value.code == 'listof'
+    assert exc.value.params['count'] == 2
+    errors = exc.value.params['errors']
+    assert [i for i, _ in errors] == [1, 3]
+    assert [err.code for _, err in errors] == ['istype', 'istype']
+
+
+def test_listof_collect_custom():
+    """
+    Given listof() validator created with collect=True and a custom item
+    validator, when it is called, then all invalid items are collected.
+    """
+    @mod.chainable
+    def item_validator(v):
+        if v < 0:
+            raise ValueError('negative', 'negative')
+        return v
+
+    validator = mod.listof(item_validator, collect=True)
+    with pytest.raises(mod.ValidationError) as exc:
+        validator([-1, 1, -2])
+    errors = exc.value.params['errors']
+    assert [(i, err.args[1]) for i, err in errors] == [
+        (0, 'negative'), (2, 'negative')]
+
+
+def test_listof_chain_items():
+    """
+    Given listof() validator with a chain of built-in validators, when it is
+    called, then items are validated with the chain.
+    """
+    item_validator = mod.make_chain([mod.required, mod.gte(0), mod.lte(9)])
+    validator = mod.listof(item_validator)
+    assert validator([0, 5, 9]) == [0, 5, 9]
+    with pytest.raises(ValueError) as exc:
+        validator([0, 10, None])
+    assert exc.value.args == (
+        'List item validation failed with error: value must be less than 9',
+        'listof')
+
+
+def test_listof_numpy():
+    """
+    Given a NumPy array, when listof() validator is called with it, then the
+    items are validated.
+    """
+    numpy = pytest.importorskip('numpy')
+    validator = mod.listof(mod.gte(0), collect=True)
+    arr = numpy.arange(10)
+    assert validator(arr) is arr
+    with pytest.raises(ValueError) as exc:
+        validator(arr - 5)
+    assert [i for i, _ in exc.value.params['errors']] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('fn', [
+    mod.optional(0),
+    mod.instanceof(int),
+    mod.istype(int),
+    mod.isin([1, 2]),
+    mod.gte(1),
+    mod.lte(1),
+    mod.match(re.compile(r'\d+$')),
+    mod.bounded_url(20),
+    mod.timestamp('%Y'),
+    mod.min_len(2),
+    mod.listof(mod.istype(int), collect=True),
+])
+def test_pickle_validators(fn):
+    """
+    Given a parametric validator, when it is pickled and unpickled, then the
+    copy has the same parameters and validates the same way.
+    """
+    import pickle
+
+    copy = pickle.loads(pickle.dumps(fn))
+    assert type(copy) is type(fn)
+    assert copy.code == fn.code
+    assert len(copy.params) == len(fn.params)
+    def outcome(check, value):
+        try:
+            result = check(value)
+        except TypeError:
+            return TypeError
+        if isinstance(result, mod.Invalid):
+            return result.error.args
+        return result
+
+    for value in [None, 0, 1, 2, '12', 'http://a.com', '2015', [1, 2]]:
+        assert outcome(copy.check, value) == outcome(fn.check, value)
+
+
+def test_validator_objects():
+    """
+    Given a parametric validator, then its parameters can be inspected, and
+    it can be used directly and in chains.
+    """
+    fn = mod.gte(2)
+    assert fn.params == (2,)
+    assert fn.__name__ == 'gte'
+    assert repr(fn) == 'Gte(2)'
+    assert fn(3) == 3
+    with pytest.raises(ValueError):
+        fn(1)
+    assert fn()(3) == 3
+    assert mod.make_chain([mod.required, fn])(3) == 3
+    assert not hasattr(fn, '__dict__')
+
+
+def test_listof_stops_at_first_error():
+    """
+    Given a list whose first item is invalid, when listof() of a built-in
+    validator is called with it, then the remaining items are not tested.
+    """
+    seen = []
+
+    class Items(list):
+        def __iter__(self):
+            for item in list.__iter__(self):
+                seen.append(item)
+                yield item
+
+    with pytest.raises(ValueError):
+        mod.listof(mod.gte(0))(Items([-1, 1, 2, 3]))
+    assert seen == [-1]
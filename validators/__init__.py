@@ -6,13 +6,78 @@ This software is free software licensed under the terms of GPLv3. See COPYING
 file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 """
 
-from .chain import ReturnEarly, chainable, make_chain
-from .validators import (required, optional, nonempty, boolean, istype, isin,
-                         gte, lte, match, url, timestamp, deprecated,
-                         min_len, instanceof, listof)
-from .helpers import OR, NOT, spec_validator
-
-__all__ = ['ReturnEarly', 'chainable', 'make_chain', 'required', 'optional',
-           'nonempty', 'boolean', 'istype', 'isin', 'gte', 'lte', 'match',
-           'url', 'timestamp', 'OR', 'NOT', 'spec_validator', 'deprecated',
-           'min_len', 'instanceof', 'listof']
+import sys
+
+# Names exported by the package, mapped to the submodules that define them
+EXPORTS = {
+    'ReturnEarly': 'chain',
+    'ValidationError': 'chain',
+    'chainable': 'chain',
+    'make_chain': 'chain',
+    'required': 'validators',
+    'optional': 'validators',
+    'nonempty': 'validators',
+    'boolean': 'validators',
+    'istype': 'validators',
+    'isin': 'validators',
+    'gte': 'validators',
+    'lte': 'validators',
+    'match': 'validators',
+    'url': 'validators',
+    'bounded_url': 'validators',
+    'timestamp': 'validators',
+    'deprecated': 'validators',
+    'min_len': 'validators',
+    'instanceof': 'validators',
+    'listof': 'validators',
+    'OR': 'helpers',
+    'NOT': 'helpers',
+    'spec_validator': 'helpers',
+}
+
+__all__ = ['ReturnEarly', 'ValidationError', 'chainable', 'make_chain',
+           'required', 'optional', 'nonempty', 'boolean', 'istype', 'isin',
+           'gte', 'lte', 'match', 'url', 'bounded_url', 'timestamp', 'OR',
+           'NOT', 'spec_validator', 'deprecated', 'min_len', 'instanceof',
+           'listof']
+
+if sys.version_info >= (3, 7):
+    import importlib
+
+    def __getattr__(name):
+        """ Import the exported names from submodules on first access
+
+        This keeps ``import validators`` cheap, so that short-lived processes
+        only pay for the submodules they use. Submodules (e.g.,
+        ``validators.helpers``) are imported on first access as well.
+        """
+        module = EXPORTS.get(name)
+        if module is not None:
+            value = getattr(importlib.import_module('.' + module, __name__),
+                            name)
+        elif not name.startswith('__'):
+            # Submodules were attributes of the package when it imported
+            # them eagerly, so they are imported on access as well
+            try:
+                value = importlib.import_module('.' + name, __name__)
+            except ModuleNotFoundError as err:
+                if err.name != '{}.{}'.format(__name__, name):
+                    raise
+                value = None
+        else:
+            value = None
+        if value is None:
+            raise AttributeError("module '{}' has no attribute '{}'".format(
+                __name__, name))
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(EXPORTS))
+else:
+    from .chain import ReturnEarly, ValidationError, chainable, make_chain
+    from .validators import (required, optional, nonempty, boolean, istype,
+                             isin, gte, lte, match, url, bounded_url,
+                             timestamp, deprecated, min_len, instanceof,
+                             listof)
+    from .helpers import OR, NOT, spec_validator
@@ -0,0 +1,88 @@
+"""
+Validator chains and spec validators for use with asyncio
+
+The chains built by this module accept chainable validators whose functions
+are coroutine functions (or return awaitables) in addition to the regular
+synchronous ones. This module requires Python 3.5 or newer.
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import asyncio
+import inspect
+import operator
+
+from .chain import ReturnEarly, identity, unchained
+
+
+def make_async_chain(fns):
+    """ Take a list of chainable validators and return a coroutine function
+
+    This function works like ``make_chain()``, but the returned validator is a
+    coroutine function which awaits the return values of validators that
+    return awaitables. ``ReturnEarly`` is trapped and the original value is
+    returned in that case, while ``ValueError`` is propagated.
+
+    Factories that are not chainable-decorated are called with an identity
+    function to obtain the validator.
+    """
+    links = []
+    for fn in fns:
+        body = unchained(fn)
+        links.append(fn(identity) if body is None else body)
+    links = tuple(links)
+
+    async def validator(v):
+        x = v
+        try:
+            for link in links:
+                x = link(x)
+                if inspect.isawaitable(x):
+                    x = await x
+        except ReturnEarly:
+            return v
+        return x
+
+    return validator
+
+
+def async_spec_validator(spec, key=operator.itemgetter, concurrency=None):
+    """ Take a spec in dict form, and return a coroutine function that
+    validates objects
+
+    This function works like ``spec_validator()``, but the chains are built
+    using ``make_async_chain()`` and the returned validator is a coroutine
+    function. Chains for different keys are run concurrently. The number of
+    chains that run at the same time can be limited by passing
+    ``concurrency``.
+    """
+    spec = [(k, key(k), make_async_chain(v)) for k, v in spec.items()]
+
+    async def validate(limit, chain, val):
+        if limit is None:
+            await chain(val)
+            return
+        async with limit:
+            await chain(val)
+
+    async def validator(obj):
+        limit = None
+        if concurrency is not None:
+            limit = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(
+            *(validate(limit, chain, getter(obj))
+              for _, getter, chain in spec),
+            return_exceptions=True)
+        errors = {}
+        for (k, _, _), result in zip(spec, results):
+            if isinstance(result, ValueError):
+                errors[k] = result
+            elif isinstance(result, BaseException):
+                raise result
+        return errors
+
+    return validator
@@ -0,0 +1,229 @@
+"""
+Validation of many values with a single chain
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import sys
+
+from .codegen import define
+
+
+# NumPy module, set by ``load_numpy()``
+numpy = None
+
+
+def load_numpy():
+    """ Return NumPy module if it has been imported, or ``None``
+
+    Values can only be NumPy arrays if NumPy has already been imported by the
+    application, so NumPy is never imported by this module. This avoids the
+    cost of importing it in applications that do not use it.
+    """
+    global numpy
+    if numpy is None:
+        numpy = sys.modules.get('numpy')
+    return numpy
+
+
+# Expressions that are true for values accepted by built-in validators. The
+# validator's parameters are substituted for ``%(p)s`` and ``%(q)s``.
+TESTS = {
+    'required': 'v is not None',
+    'nonempty': "v not in ('', [], {})",
+    'boolean': 'v in (True, False)',
+    'istype': 'type(v) is %(p)s',
+    'instanceof': 'isinstance(v, %(p)s)',
+    'isin': 'v in %(p)s',
+    'gte': 'v >= %(p)s',
+    'lte': 'v <= %(p)s',
+    'range': 'v >= %(p)s and v <= %(q)s',
+}
+
+
+def vector_isin(arr, collection):
+    if isinstance(collection, (str, bytes)):
+        # Substring test cannot be vectorized
+        return None
+    return numpy.isin(arr, list(collection))
+
+
+def vector_type(arr, t, test):
+    if arr.dtype.kind == 'O':
+        return None
+    return numpy.full(arr.shape, test(arr.dtype.type, t), dtype=bool)
+
+
+def vector_boolean(arr):
+    if arr.dtype.kind == 'b':
+        return numpy.ones(arr.shape, dtype=bool)
+    if arr.dtype.kind not in 'iuf':
+        return None
+    return (arr == 0) | (arr == 1)
+
+
+def vector_numeric(arr):
+    # Numeric arrays never contain None or empty sequences
+    if arr.dtype.kind not in 'biuf':
+        return None
+    return numpy.ones(arr.shape, dtype=bool)
+
+
+# Functions that take an array and validator's parameters, and return a
+# boolean mask of accepted values, or ``None`` if the array cannot be handled.
+VECTORS = {
+    'required': vector_numeric,
+    'nonempty': vector_numeric,
+    'boolean': vector_boolean,
+    'istype': lambda arr, t: vector_type(arr, t, lambda a, b: a is b),
+    'instanceof': lambda arr, t: vector_type(arr, t, issubclass),
+    'isin': vector_isin,
+    'gte': lambda arr, num: arr >= num,
+    'lte': lambda arr, num: arr <= num,
+    'range': lambda arr, low, high: (arr >= low) & (arr <= high),
+}
+
+
+def describe(fns):
+    """ Return a list of ``(code, params)`` pairs for chainable validators
+
+    If any of the validators is not a built-in validator that can be tested
+    without calling it, ``None`` is returned.
+    """
+    links = []
+    for fn in fns:
+        code = getattr(fn, 'code', None)
+        if code not in TESTS:
+            return None
+        links.append((code, fn.params))
+    return links
+
+
+def compile_tests(links):
+    """ Return a function that runs the chain over a list of values
+
+    The generated function tests all values in a single loop using inline
+    expressions for each built-in validator. Only the values that fail the
+    test are passed to the chain, which raises the appropriate error.
+    """
+    namespace = {}
+    tests = []
+    for i, (code, params) in enumerate(links):
+        names = {}
+        for key, param in zip('pq', params):
+            names[key] = '{}{}'.format(key, i)
+            namespace[names[key]] = param
+        tests.append('({})'.format(TESTS[code] % names))
+    lines = [
+        'def run(chain, results):',
+        '    errors = []',
+        '    for i, v in enumerate(results):',
+        '        try:',
+        '            if {}:'.format(' and '.join(tests) or 'True'),
+        '                continue',
+        '        except Exception:',
+        '            pass',
+        '        try:',
+        '            results[i] = chain(v)',
+        '        except ValueError as err:',
+        '            errors.append((i, err))',
+        '    return errors',
+    ]
+    return define('\n'.join(lines) + '\n', '<batch>', namespace, 'run')
+
+
+def run_all(chain, results):
+    errors = []
+    for i, v in enumerate(results):
+        try:
+            results[i] = chain(v)
+        except ValueError as err:
+            errors.append((i, err))
+    return errors
+
+
+def mask(links, arr):
+    """ Return a mask of values in array accepted by all validators
+
+    If the array cannot be validated using vectorized operations, ``None`` is
+    returned.
+    """
+    accepted = numpy.ones(arr.shape, dtype=bool)
+    for code, params in links:
+        try:
+            ok = VECTORS[code](arr, *params)
+        except TypeError:
+            return None
+        if ok is None:
+            return None
+        accepted &= ok
+    return accepted
+
+
+class Batch(object):
+    """ Validates many values using a chain (see ``batch()``) """
+
+    __slots__ = ('fns', 'chain', 'links', 'compiled')
+
+    def __init__(self, fns, chain):
+        self.fns = fns
+        self.chain = chain
+        # The validators are described, and the tests compiled, when the
+        # batch is first used, so chains that are never used in batches do
+        # not pay for it
+        self.links = False
+        self.compiled = None
+
+    def describe(self):
+        if self.links is False:
+            self.links = describe(self.fns)
+        return self.links
+
+    @property
+    def simple(self):
+        return self.describe() is not None
+
+    def __call__(self, values):
+        links = self.describe()
+        chain = self.chain
+        if (links is not None and load_numpy() is not None and
+                isinstance(values, numpy.ndarray) and values.ndim == 1):
+            accepted = mask(links, values)
+            if accepted is not None:
+                errors = []
+                for i in numpy.flatnonzero(~accepted):
+                    try:
+                        chain(values[i])
+                    except ValueError as err:
+                        errors.append((int(i), err))
+                return values, errors
+        if self.compiled is None:
+            self.compiled = (run_all if links is None else
+                             compile_tests(links))
+        results = list(values)
+        return results, self.compiled(chain, results)
+
+
+def batch(fns, chain):
+    """ Return a function that validates many values using the chain
+
+    ``fns`` is the list of chainable validators that ``chain`` was built from.
+
+    The returned function takes an iterable of values and returns a
+    ``(results, errors)`` tuple. ``results`` is a list of values returned by
+    the chain, with the original value in place of each value that failed to
+    validate. ``errors`` is a list of ``(index, exc)`` tuples for values that
+    failed, in order of their index.
+
+    When the chain consists only of built-in validators, values are tested
+    inline without calling the validators, and only the values that fail the
+    test are passed through the chain to obtain the error. If NumPy is
+    available and the values are passed as an array, the test is vectorized,
+    and the array itself is returned as results. The returned function's
+    ``simple`` attribute is ``True`` when the chain is tested this way.
+    """
+    return Batch(fns, chain)
@@ -0,0 +1,187 @@
+"""
+Memoization of validator results
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import copy
+import time
+import functools
+import threading
+import collections
+
+from .chain import (ReturnEarly, Signal, Invalid, STOP, chainable,
+                    unchained)
+from .batch import batch
+
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'bypasses', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """ Bounded mapping that discards least recently used items
+
+    When ``maxsize`` items are stored, storing another item discards the item
+    that was least recently looked up or stored. If ``ttl`` is specified,
+    items older than ``ttl`` seconds are discarded when looked up. ``clock``
+    is the function used to get current time in seconds.
+
+    The cache is safe to use from multiple threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.items = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def get(self, key):
+        """ Return a ``(found, value)`` tuple for the key
+
+        ``TypeError`` is raised if key is not hashable.
+        """
+        with self.lock:
+            try:
+                expires, value = self.items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return False, None
+            if expires is not None and expires <= self.clock():
+                self.misses += 1
+                return False, None
+            self.items[key] = (expires, value)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value):
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self.lock:
+            self.items.pop(key, None)
+            self.items[key] = (expires, value)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def bypass(self):
+        """ Record a lookup that could not use the cache """
+        with self.lock:
+            self.bypasses += 1
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.hits = self.misses = self.bypasses = 0
+
+    def info(self):
+        """ Return hit and miss statistics as ``CacheInfo`` named tuple """
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.bypasses,
+                             self.maxsize, len(self.items))
+
+
+def cached(fn, cache):
+    """ Return a version of ``fn`` which stores outcomes in the cache
+
+    Both return values and ``ValueError`` and ``ReturnEarly`` exceptions are
+    cached. A copy of the cached exception is raised for cached failures.
+    Values are cached together with their type, so that values which compare
+    equal but are of different types (e.g., ``1`` and ``True``) are not
+    mixed up. Values that are not hashable are passed to ``fn`` without using
+    the cache. Attributes of ``fn`` (e.g., the ``check`` of a chain) are not
+    copied, as they would not use the cache.
+    """
+    @functools.wraps(fn, updated=())
+    def validator(v):
+        key = (type(v), v)
+        try:
+            found, outcome = cache.get(key)
+        except TypeError:
+            cache.bypass()
+            return fn(v)
+        if not found:
+            try:
+                outcome = (True, fn(v))
+            except (ValueError, ReturnEarly) as exc:
+                outcome = (False, exc)
+            cache.set(key, outcome)
+        ok, result = outcome
+        if ok:
+            return result
+        raise copy.copy(result)
+    return validator
+
+
+def cached_check(check, cache):
+    """ Return a version of check which stores its results in the cache
+
+    This is ``cached()`` for checks (see ``validators.chain.as_check()``).
+    ``Invalid`` results are cached, and a copy of the error is returned for
+    cached failures.
+    """
+    def cached(v):
+        key = (type(v), v)
+        try:
+            found, result = cache.get(key)
+        except TypeError:
+            cache.bypass()
+            return check(v)
+        if not found:
+            result = check(v)
+            cache.set(key, result)
+        elif isinstance(result, Invalid):
+            result = Invalid(copy.copy(result.error))
+        return result
+    return cached
+
+
+def cached_chain(chain, cache):
+    """ Return a version of a chain which uses the cache
+
+    ``chain`` is a chain returned by ``make_chain()``. The returned function,
+    its ``check`` and its ``many()`` method all use the cache, so the chain
+    is cached also when it is used through its check (e.g., by ``listof()``,
+    ``OR()`` or within another chain).
+    """
+    check = cached_check(chain.check, cache)
+
+    @functools.wraps(chain, updated=())
+    def validator(v):
+        x = check(v)
+        if isinstance(x, Signal):
+            if x is STOP:
+                return v
+            raise x.error
+        return x
+    validator.check = check
+    validator.many = batch([validator], validator)
+    return validator
+
+
+def memoize(fn, maxsize=1024, ttl=None):
+    """ Return a version of validator or chain that caches its results
+
+    ``fn`` can be a chainable validator or a chain returned by
+    ``make_chain()``. When a chainable validator is passed, the return value
+    is also a chainable validator. The cache is a ``LRUCache`` instance with
+    the specified ``maxsize`` and ``ttl``, and is available as ``cache``
+    attribute of the returned function. See ``cached()`` for details on what
+    is cached.
+    """
+    cache = LRUCache(maxsize, ttl)
+    body = unchained(fn)
+    if body is not None:
+        validator = chainable(cached(body, cache))
+    elif getattr(fn, 'check', None) is not None:
+        validator = cached_chain(fn, cache)
+    else:
+        validator = cached(fn, cache)
+    validator.cache = cache
+    return validator
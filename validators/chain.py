@@ -10,12 +10,291 @@ file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 
 import functools
 
+from .batch import batch
+from .codegen import define_once
+
 
 class ReturnEarly(Exception):
     """ Raised to cause the validator chain to return early """
     pass
 
 
+class ValidationError(ValueError):
+    """ Raised by validators when value is invalid
+
+    The error stores the error ``code`` and the parameters of the failed
+    validation, and only formats the ``message`` format string with the
+    parameters when the message is needed (e.g., when the error is converted
+    to a string). This makes raising errors cheap when large values or
+    collections are part of the message. Messages of errors without
+    parameters are not formatted, so they may contain braces.
+
+    Like errors raised by validators as ``ValueError(message, code)``, the
+    ``args`` attribute is a ``(message, code)`` tuple. When ``args`` is
+    assigned, the new value is used as is, and the parameters are cleared.
+    """
+
+    def __init__(self, message, code, **params):
+        # The message and code are stored in ``args`` by the constructor of
+        # ``ValueError``, so only the parameters are stored here
+        self.params = params
+
+    @property
+    def template(self):
+        return BASE_ARGS.__get__(self)[0]
+
+    @property
+    def code(self):
+        args = BASE_ARGS.__get__(self)
+        return args[1] if len(args) > 1 else None
+
+    @property
+    def message(self):
+        if not self.params:
+            args = BASE_ARGS.__get__(self)
+            return args[0] if args else ''
+        try:
+            return self.__dict__['rendered']
+        except KeyError:
+            template = BASE_ARGS.__get__(self)[0]
+            rendered = self.__dict__['rendered'] = template.format(
+                **self.params)
+            return rendered
+
+    @property
+    def args(self):
+        if not self.params:
+            return BASE_ARGS.__get__(self)
+        return (self.message, self.code)
+
+    @args.setter
+    def args(self, value):
+        BASE_ARGS.__set__(self, value)
+        self.params = {}
+        self.__dict__.pop('rendered', None)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(type(self).__name__, self.message,
+                                       self.code)
+
+    def __reduce__(self):
+        return (type(self), BASE_ARGS.__get__(self), self.__dict__)
+
+
+# Descriptor of ``args`` of built-in exceptions, which holds the message
+# template and code of ``ValidationError`` instances
+BASE_ARGS = BaseException.__dict__['args']
+
+
+def identity(x):
+    """ Return the value as is (end of any validator chain) """
+    return x
+
+
+def unchained(fn):
+    """ Return the undecorated function of a chainable validator
+
+    If ``fn`` is not a chainable validator (e.g., it is an arbitrary factory
+    that wraps the rest of the chain), ``None`` is returned.
+    """
+    return getattr(fn, 'unchained', None)
+
+
+class Signal(object):
+    """ Result of a check that ends the chain (see ``as_check()``)
+
+    Checks return ``Signal`` instances instead of raising exceptions, so any
+    other value returned by a check, including an exception, is the
+    validated value.
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'STOP'
+
+
+class Invalid(Signal):
+    """ Result of a check for an invalid value
+
+    ``error`` is the ``ValueError`` that the validator would raise.
+    """
+
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+    def __repr__(self):
+        return 'Invalid({!r})'.format(self.error)
+
+
+# Returned by checks instead of raising ``ReturnEarly``
+STOP = Signal()
+
+
+def invalid(message, code, **params):
+    """ Return the result of a check for an invalid value
+
+    The arguments are those of ``ValidationError``.
+    """
+    return Invalid(ValidationError(message, code, **params))
+
+
+def as_check(fn):
+    """ Return a check function for a chainable validator
+
+    A check is a function that takes a value and, instead of raising
+    exceptions, returns the ``STOP`` constant to return early, or an
+    ``Invalid`` instance holding the error if the value is invalid. Otherwise
+    it returns the value.
+
+    Validators created with ``checkable`` and chains returned by
+    ``make_chain()`` have a ``check`` attribute which is returned as is. For
+    other validators, a function that converts exceptions into return values
+    is returned.
+    """
+    check = getattr(fn, 'check', None)
+    if check is not None:
+        return check
+    body = unchained(fn) or fn
+
+    def check(v):
+        try:
+            return body(v)
+        except ReturnEarly:
+            return STOP
+        except ValueError as err:
+            return Invalid(err)
+    return check
+
+
+# Sources of generated chain functions, keyed by the shape of the chain
+SOURCES = {}
+
+
+def chain_source(checks, tail=False, trap=False, results=False):
+    """ Return source of a factory of functions that call a list of functions
+
+    ``checks`` is a tuple of flags, one for each function, which tell whether
+    the function is a check. ``tail`` tells whether the chain has a tail. The
+    factory, ``make()``, takes the functions as ``f0``, ``f1``, and so on,
+    followed by the tail, and returns the chain function. See ``compose()``
+    for the meaning of the other arguments.
+    """
+    key = (checks, tail, trap, results)
+    source = SOURCES.get(key)
+    if source is not None:
+        return source
+    params = ['f{}'.format(i) for i in range(len(checks))]
+    if tail:
+        params.append('tail')
+    indent = '            ' if trap else '        '
+    lines = ['def make({}):'.format(', '.join(params)), '    def chain(v):']
+    if trap:
+        lines.append('        try:')
+    arg = 'v'
+    for i, is_check in enumerate(checks):
+        lines.append('{}x = f{}({})'.format(indent, i, arg))
+        arg = 'x'
+        if not is_check:
+            continue
+        # ``STOP`` and ``Invalid`` are tested with a single class, which is
+        # faster than testing for both
+        lines.append('{}if isinstance(x, Signal):'.format(indent))
+        lines.append('{}    if x is STOP:'.format(indent))
+        if trap:
+            lines.append('{}        return v'.format(indent))
+        else:
+            lines.append('{}        raise ReturnEarly()'.format(indent))
+        if results:
+            lines.append('{}    return x'.format(indent))
+        else:
+            lines.append('{}    raise x.error'.format(indent))
+    if tail:
+        lines.append('{}return tail({})'.format(indent, arg))
+    else:
+        lines.append('{}return {}'.format(indent, arg))
+    if trap:
+        lines.append('        except ReturnEarly:')
+        lines.append('            return v')
+    if results:
+        lines.append('        except ValueError as err:')
+        lines.append('            return Invalid(err)')
+    lines.append('    return chain')
+    source = SOURCES[key] = '\n'.join(lines) + '\n'
+    return source
+
+
+# Factories of chain functions, keyed by the shape of the chain
+FACTORIES = {}
+
+# Globals of the generated chain functions
+CHAIN_GLOBALS = {'ReturnEarly': ReturnEarly, 'STOP': STOP,
+                 'isinstance': isinstance, 'Signal': Signal,
+                 'Invalid': Invalid, 'ValueError': ValueError}
+
+
+def compose(links, tail=None, trap=False, results=False):
+    """ Compile a list of plain validator functions into a single function
+
+    ``links`` is a list of ``(fn, is_check)`` pairs. When ``is_check`` is
+    ``False``, ``fn`` is the undecorated function of a chainable validator
+    which raises exceptions. Otherwise it is a check (see ``as_check()``).
+
+    The returned function passes the value through each of the functions in
+    order, and finally through ``tail`` if one is specified. The calls are
+    written out in the body of a generated function, so the whole sequence
+    runs in a single frame. If ``trap`` is ``True``, ``ReturnEarly`` is
+    trapped and the original value is returned.
+
+    If ``results`` is ``True``, ``ValueError`` is not raised, but returned
+    as ``Invalid``, so the returned function is itself a check which never
+    returns ``STOP``.
+    This requires ``trap`` to be ``True``.
+
+    The source of the function only depends on the shape of the chain, so it
+    is generated and compiled once for all chains of the same shape, as a
+    factory which takes the functions of the chain as arguments.
+    """
+    return build([fn for fn, _ in links],
+                 tuple([is_check for _, is_check in links]), tail, trap,
+                 results)
+
+
+def build(fns, checks, tail=None, trap=False, results=False):
+    """ Return a chain function for the functions with the given flags
+
+    This is ``compose()`` with the links split into a list of functions and
+    a tuple of ``is_check`` flags, so that they can be reused for more than
+    one function.
+    """
+    key = (checks, tail is not None, trap, results)
+    make = FACTORIES.get(key)
+    if make is None:
+        make = FACTORIES[key] = define_once(chain_source(*key), '<chain>',
+                                            CHAIN_GLOBALS, 'make')
+    if tail is not None:
+        return make(*(fns + [tail]))
+    return make(*fns)
+
+
+def described(code, *params):
+    """ Mark a chainable validator with its error code and parameters
+
+    The code and parameters allow other parts of the library (e.g., the batch
+    validation in ``validators.batch``) to recognize built-in validators.
+    """
+    def decorator(fn):
+        fn.code = code
+        fn.params = params
+        return fn
+    return decorator
+
+
 def chainable(fn):
     """ Make function a chainable validator
 
@@ -24,17 +303,142 @@ def chainable(fn):
     validator: ``fn(next(value))``.
 
     The chainable validators are used with the ``make_chain()`` function.
+
+    The original function is available as ``unchained`` attribute of the
+    returned factory, which allows ``make_chain()`` to call it directly.
     """
     @functools.wraps(fn)
-    def wrapper(nxt=lambda x: x):
+    def wrapper(nxt=identity):
         if hasattr(nxt, '__call__'):
             return lambda x: nxt(fn(x))
         # Value has been passsed directly, so we don't chain
         return fn(nxt)
+    wrapper.unchained = fn
     return wrapper
 
 
-def make_chain(fns):
+def checkable(check):
+    """ Make a check function a chainable validator
+
+    The check function returns ``STOP`` or an ``Invalid`` instance instead of
+    raising ``ReturnEarly`` or the error (see ``as_check()``). The
+    returned chainable validator raises them as any other validator when used
+    directly, but chains built by ``make_chain()`` call the check and test
+    its return value, so no exceptions are raised within the chain. The check
+    is available as ``check`` attribute of the returned validator.
+    """
+    @functools.wraps(check)
+    def fn(v):
+        x = check(v)
+        if isinstance(x, Signal):
+            if x is STOP:
+                raise ReturnEarly()
+            raise x.error
+        return x
+    wrapper = chainable(fn)
+    wrapper.check = check
+    return wrapper
+
+
+class Validator(object):
+    """ Base class for chainable validators that have parameters
+
+    Instances of subclasses are chainable validators which can also be
+    pickled, copied and inspected, unlike validators created by
+    ``checkable`` from closures.
+
+    Subclasses list the parameters of their constructor in ``fields``, store
+    them (and any values derived from them) in slots, and implement the
+    ``check()`` method (see ``as_check()``). ``code`` is the error code of the
+    validator (see ``described()``), and ``params`` are the values of the
+    ``fields``. Instances are pickled by passing ``params`` to the
+    constructor.
+    """
+
+    __slots__ = ()
+    fields = ()
+    code = None
+
+    @property
+    def params(self):
+        return tuple(getattr(self, name) for name in self.fields)
+
+    @property
+    def __name__(self):
+        return self.code or type(self).__name__
+
+    def check(self, v):
+        raise NotImplementedError()
+
+    def unchained(self, v):
+        x = self.check(v)
+        if isinstance(x, Signal):
+            if x is STOP:
+                raise ReturnEarly()
+            raise x.error
+        return x
+
+    def __call__(self, nxt=identity):
+        if hasattr(nxt, '__call__'):
+            unchained = self.unchained
+            return lambda x: nxt(unchained(x))
+        # Value has been passsed directly, so we don't chain
+        return self.unchained(nxt)
+
+    def __reduce__(self):
+        return (type(self), self.params)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__,
+                               ', '.join(repr(p) for p in self.params))
+
+
+def chain_links(fns, stats=None, label=None):
+    """ Return a ``(links, tail)`` tuple for a list of chainable validators
+
+    ``links`` are the links of the chain that can be passed to ``compose()``,
+    and ``tail`` is the rest of the chain wrapped by opaque factories (or
+    ``None``). See ``make_chain()`` for details.
+    """
+    if stats is not None:
+        # The profiling module tests results of checks, so it imports this
+        # module, and is only needed for instrumented chains
+        from .profiling import timed, link_name
+    links = []
+    tail = None
+    for i in range(len(fns) - 1, -1, -1):
+        fn = fns[i]
+        check = getattr(fn, 'check', None)
+        body = None if check is not None else unchained(fn)
+        if stats is not None and (check or body) is not None:
+            name = '{}{}:{}'.format(label or '', i, link_name(fn))
+            links.append((timed(as_check(fn), name, stats), True))
+            continue
+        if check is not None:
+            links.append((check, True))
+            continue
+        if body is not None:
+            links.append((body, False))
+            continue
+        if links:
+            tail = compose(links[::-1], tail)
+            links = []
+        tail = fn(identity if tail is None else tail)
+    links.reverse()
+    return links, tail
+
+
+def make_check(fns, stats=None, label=None):
+    """ Return only the ``check`` of the chain ``make_chain()`` would return
+
+    This is cheaper than ``make_chain()`` when only the check is needed
+    (e.g., for keys of a spec).
+    """
+    links, tail = chain_links(fns, stats, label)
+    return compose(links, tail, trap=True, results=True)
+
+
+def make_chain(fns, stats=None, label=None):
     """ Take a list of chainable validators and return a chained validator
 
     The functions should be decorated with ``chainable`` decorator.
@@ -43,15 +447,33 @@ def make_chain(fns):
     ``ReturnEarly`` exception which is trapped. When ``ReturnEarly`` exception
     is trapped, the original value passed to the chained validator is returned
     as is.
-    """
-    chain = lambda x: x
-    for fn in reversed(fns):
-        chain = fn(chain)
 
-    def validator(v):
-        try:
-            return chain(v)
-        except ReturnEarly:
-            return v
+    Consecutive chainable validators are compiled into a single function
+    (see ``compose()``), so calling the chain does not go through a nested
+    call for each validator. Any other callables in the list are treated as
+    opaque factories and are passed the remainder of the chain as before.
 
+    The returned validator has a ``check`` attribute, which is a version of
+    the chain that returns errors as ``Invalid`` instances instead of raising
+    them.
+    Validators created with ``checkable`` do not raise exceptions within the
+    chain at all.
+
+    The returned validator also has a ``many()`` method which validates an
+    iterable of values in one call. See ``validators.batch.batch()`` for
+    details. The list of validators is available as ``fns`` attribute.
+
+    If ``stats`` is specified (see ``validators.profiling.Stats``), the time
+    spent in each chainable validator, and the failures, are recorded in it.
+    ``label`` is prepended to the labels of the links (e.g., ``'foo/'``).
+    Validators which are not chainable validators are not recorded. Without
+    ``stats``, the chain is not instrumented in any way.
+    """
+    links, tail = chain_links(fns, stats, label)
+    link_fns = [fn for fn, _ in links]
+    checks = tuple([is_check for _, is_check in links])
+    validator = build(link_fns, checks, tail, trap=True)
+    validator.check = build(link_fns, checks, tail, trap=True, results=True)
+    validator.many = batch(fns, validator)
+    validator.fns = list(fns)
     return validator
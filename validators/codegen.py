@@ -0,0 +1,65 @@
+"""
+Compilation of generated source code
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import marshal
+
+
+# Code objects of compiled source, keyed by ``(filename, source)``
+CODE = {}
+
+
+def compile_cached(source, filename):
+    """ Return code object for the source, compiling it only once
+
+    Generated functions of the same shape (e.g., chains with the same number
+    of links) have the same source, so in a large spec, most of the sources
+    are only compiled once.
+    """
+    key = (filename, source)
+    code = CODE.get(key)
+    if code is None:
+        code = CODE[key] = compile(source, filename, 'exec')
+    return code
+
+
+def define(source, filename, namespace, name):
+    """ Execute the source in the namespace and return the named object """
+    exec(compile_cached(source, filename), namespace)
+    return namespace[name]
+
+
+# Functions defined by executed source, keyed by ``(filename, source, name)``
+DEFINED = {}
+
+
+def define_once(source, filename, namespace, name):
+    """ Return the named object defined by the source, executing it once
+
+    The namespace is only used the first time the source is executed, so
+    this is used for sources that define factories, whose arguments differ
+    between calls, while their globals do not.
+    """
+    key = (filename, source, name)
+    obj = DEFINED.get(key)
+    if obj is None:
+        obj = DEFINED[key] = define(source, filename, dict(namespace), name)
+    return obj
+
+
+def dump_code():
+    """ Return all compiled code as a dict of marshalled code objects """
+    return dict((key, marshal.dumps(code)) for key, code in CODE.items())
+
+
+def load_code(data):
+    """ Add code returned by ``dump_code()`` to the compiled code """
+    for key, dumped in data.items():
+        if key not in CODE:
+            CODE[key] = marshal.loads(dumped)
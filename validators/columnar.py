@@ -0,0 +1,104 @@
+"""
+Validation of records stored as columns
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from .batch import load_numpy
+from .chain import make_chain
+from .helpers import is_spec_list, optimize_spec
+
+
+class ColumnResults(object):
+    """ Results of validating columns
+
+    ``masks`` maps each spec key to a mask of the column's values that passed
+    validation. The masks are NumPy boolean arrays if NumPy has been
+    imported, and lists of booleans otherwise. ``errors`` maps the index of
+    each invalid row to a dict of errors keyed by spec key, in the same form
+    as returned by validators created with ``spec_validator()``. ``values``
+    maps each key to the values returned by its chain (see
+    ``validators.batch.batch()``).
+    """
+
+    def __init__(self, size, masks, errors, values):
+        self.size = size
+        self.masks = masks
+        self.errors = errors
+        self.values = values
+
+    @property
+    def valid(self):
+        """ Mask of rows in which all values passed validation """
+        return make_mask(self.size, self.errors)
+
+    def __repr__(self):
+        return 'ColumnResults(size={}, invalid={})'.format(
+            self.size, len(self.errors))
+
+
+def make_mask(size, failed):
+    """ Return a mask of ``size`` values with indices in ``failed`` unset """
+    numpy = load_numpy()
+    if numpy is not None:
+        mask = numpy.ones(size, dtype=bool)
+        mask[list(failed)] = False
+        return mask
+    mask = [True] * size
+    for i in failed:
+        mask[i] = False
+    return mask
+
+
+def columnar_validator(spec, optimize=False):
+    """ Take a spec in dict form, and return a function that validates columns
+
+    The returned function takes a dict that maps spec keys to columns (lists,
+    NumPy arrays or any other sequences of equal length), or a NumPy
+    structured array whose fields are the spec keys, and returns a
+    ``ColumnResults`` object. Each key's chain is run over the whole column
+    at once using the chain's ``many()`` method, so columns of built-in
+    validators such as ``istype()``, ``gte()``, ``lte()`` and ``isin()`` are
+    tested without calling the validators, and NumPy arrays are tested using
+    vectorized operations (see ``validators.batch.batch()``).
+
+    Note that values of NumPy arrays are NumPy scalars, which do not pass
+    ``istype(int)`` or ``istype(float)``. Use ``instanceof()`` with abstract
+    types from the ``numbers`` module instead.
+
+    Nested specs are not supported. If ``optimize`` is ``True``, chains are
+    simplified before they are compiled (see
+    ``validators.optimize.optimize()``).
+    """
+    if optimize:
+        spec = optimize_spec(spec)
+    chains = []
+    for k, v in spec.items():
+        if isinstance(v, dict) or is_spec_list(v):
+            raise ValueError("nested spec for key '{}' cannot be used with "
+                             "columns".format(k))
+        chains.append((k, make_chain(v)))
+
+    def validator(columns):
+        size = 0 if not chains else None
+        for k, _ in chains:
+            length = len(columns[k])
+            if size is None:
+                size = length
+            elif length != size:
+                raise ValueError("column '{}' has {} values, expected "
+                                 "{}".format(k, length, size))
+        masks = {}
+        errors = {}
+        values = {}
+        for k, chain in chains:
+            values[k], failed = chain.many(columns[k])
+            masks[k] = make_mask(size, (i for i, _ in failed))
+            for i, err in failed:
+                errors.setdefault(i, {})[k] = err
+        return ColumnResults(size, masks, errors, values)
+    return validator
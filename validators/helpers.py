@@ -9,41 +9,451 @@ file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 """
 
 import operator
+import threading
 
-from .chain import chainable, make_chain
+from .chain import (Validator, ValidationError, as_check, make_check, STOP,
+                    Invalid)
+from .validators import is_sequence
+from .profiling import timed, clock
+from .optimize import optimize as optimize_chain
 
 
-def OR(*fns):
-    """ Validate with any of the chainable valdator functions """
+class Ranking(object):
+    """ Order of alternatives ranked by the number of times they succeeded
+
+    Every ``interval`` calls, the alternatives are sorted by the number of
+    successes, most successful first, with ties broken by the original order.
+    After ``warmup`` calls (if specified), or when ``freeze()`` is called, the
+    order no longer changes and successes are no longer counted.
+
+    The order is replaced as a whole, so it can be read from multiple threads
+    without locking. Counts may be slightly off when the ranking is updated
+    from multiple threads at once, which only affects the order.
+    """
+
+    def __init__(self, count, interval=100, warmup=None):
+        if interval < 1:
+            raise ValueError('interval must be at least 1')
+        self.order = tuple(range(count))
+        self.successes = [0] * count
+        self.calls = 0
+        self.interval = interval
+        self.warmup = warmup
+        self.next_update = interval
+        self.frozen = False
+        self.lock = threading.Lock()
+
+    def hit(self, index):
+        self.successes[index] += 1
+        self.miss()
+
+    def miss(self):
+        self.calls += 1
+        if self.calls >= self.next_update:
+            self.update()
+
+    def update(self):
+        with self.lock:
+            if self.frozen:
+                return
+            successes = self.successes
+            self.order = tuple(sorted(range(len(successes)),
+                                      key=lambda i: (-successes[i], i)))
+            self.next_update = self.calls + self.interval
+            if self.warmup is not None and self.calls >= self.warmup:
+                self.frozen = True
+
+    def freeze(self):
+        """ Update the order one last time and keep it """
+        self.update()
+        self.frozen = True
+
+
+class Or(Validator):
+    """ Validates with the first of the validators that passes """
+
+    __slots__ = ('fns', 'checks')
+    fields = ('fns',)
+
+    def __init__(self, fns):
+        self.fns = tuple(fns)
+        self.checks = [as_check(fn) for fn in self.fns]
+
+    def check(self, v):
+        for check in self.checks:
+            result = check(v)
+            if not isinstance(result, Invalid):
+                return result
+        return result
+
+
+class AdaptiveOr(Validator):
+    """ Validates with the validators in order of past success
+
+    See ``Ranking`` for details on how the order is updated. When all
+    validators fail, the error of the last validator (in the original order)
+    is returned regardless of the current order. The ranking is not pickled.
+    """
+
+    __slots__ = ('fns', 'interval', 'warmup', 'checks', 'ranking', 'last')
+    fields = ('fns', 'interval', 'warmup')
+
+    def __init__(self, fns, interval=100, warmup=None):
+        self.fns = tuple(fns)
+        self.interval = interval
+        self.warmup = warmup
+        self.checks = [as_check(fn) for fn in self.fns]
+        self.ranking = Ranking(len(self.fns), interval, warmup)
+        self.last = len(self.fns) - 1
+
+    def freeze(self):
+        self.ranking.freeze()
+
+    def check(self, v):
+        ranking = self.ranking
+        checks = self.checks
+        error = None
+        for i in ranking.order:
+            result = checks[i](v)
+            if not isinstance(result, Invalid):
+                if not ranking.frozen:
+                    ranking.hit(i)
+                return result
+            if i == self.last:
+                error = result
+        if not ranking.frozen:
+            ranking.miss()
+        return error
+
+
+def OR(*fns, **options):
+    """ Validate with any of the chainable valdator functions
+
+    If ``adaptive=True`` is passed, the functions are reordered as the
+    validator is used, so that the function which succeeds most often is
+    tried first. The order is updated every ``interval`` calls (default 100),
+    and is frozen after ``warmup`` calls if specified. The order can also be
+    frozen at any time by calling the ``freeze()`` method of the returned
+    validator, and the current order (as indices of the functions) is its
+    ``ranking.order`` attribute.
+
+    Adaptive ordering does not change whether a value passes, or which error
+    is raised when it does not. The value is returned by whichever function
+    succeeds first, so the functions should return the same value when more
+    than one of them can succeed (as all built-in validators do).
+    """
+    adaptive = options.pop('adaptive', False)
+    interval = options.pop('interval', 100)
+    warmup = options.pop('warmup', None)
+    if options:
+        raise TypeError('Unexpected keyword arguments: {}'.format(
+            ', '.join(sorted(options))))
     if len(fns) < 2:
         raise TypeError('At least two functions must be passed')
+    if adaptive:
+        return AdaptiveOr(fns, interval, warmup)
+    return Or(fns)
 
-    @chainable
-    def validator(v):
-        for fn in fns:
-            last = None
-            try:
-                return fn(v)
-            except ValueError as err:
-                last = err
-        if last:
-            raise last
-    return validator
+
+class Not(Validator):
+    """ Reverses the effect of a validator """
+
+    __slots__ = ('fn', 'fn_check')
+    fields = ('fn',)
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.fn_check = as_check(fn)
+
+    def check(self, v):
+        result = self.fn_check(v)
+        if result is STOP:
+            return STOP
+        if isinstance(result, Invalid):
+            return v
+        return Invalid(ValueError('invalid'))
 
 
 def NOT(fn):
     """ Reverse the effect of a chainable validator function """
-    @chainable
-    def validator(v):
-        try:
-            fn(v)
-        except ValueError:
-            return v
-        raise ValueError('invalid')
-    return validator
+    return Not(fn)
+
+
+def path_getter(getters, nested=False):
+    """ Return a function that gets a value using a sequence of getters
+
+    If any of the intermediate values is ``None``, or is not a mapping (the
+    next getter raises ``TypeError``), ``None`` is returned. If ``nested`` is
+    ``True``, the object itself is treated as an intermediate value (e.g.,
+    an item of a list of nested specs).
+    """
+    if len(getters) == 1 and not nested:
+        return getters[0]
+    if nested:
+        first, rest = None, getters
+    else:
+        first, rest = getters[0], getters[1:]
+
+    def getter(obj):
+        value = obj if first is None else first(obj)
+        for get in rest:
+            if value is None:
+                return None
+            try:
+                value = get(value)
+            except TypeError:
+                return None
+        return value
+    return getter
+
+
+def is_spec_list(v):
+    """ Test whether spec value is a list containing a single nested spec """
+    return (isinstance(v, (list, tuple)) and len(v) == 1 and
+            isinstance(v[0], dict))
+
+
+def optimize_spec(spec):
+    """ Return a copy of (nested) spec with optimized chains
+
+    See ``validators.optimize.optimize()``.
+    """
+    optimized = type(spec)()
+    for k, v in spec.items():
+        if isinstance(v, dict):
+            optimized[k] = optimize_spec(v)
+        elif is_spec_list(v):
+            optimized[k] = [optimize_spec(v[0])]
+        else:
+            optimized[k] = optimize_chain(v)
+    return optimized
+
+
+def compile_plan(spec, key, prefix=None, getters=(), stats=None, scope='',
+                 nested=False):
+    """ Compile a (nested) spec into a flat list of steps
+
+    Each step is a ``(path, getter, check, subplan)`` tuple. ``path`` is the
+    key in the errors dict, which is the spec key for top-level keys, and a
+    dotted path for nested keys. ``getter`` returns the value from the
+    object, going through all levels of nesting at once.
+
+    For keys that map to chains, ``check`` is the chain's check function and
+    ``subplan`` is ``None``. For keys that map to a list of nested specs,
+    ``check`` is ``None`` and ``subplan`` is the plan for the items of the
+    list, with paths relative to the list item.
+
+    If ``stats`` is specified, the checks record their timing in it (see
+    ``validators.profiling.Stats``). Checks in subplans are labelled with
+    ``scope`` prepended to their path. ``nested`` is ``True`` for subplans,
+    whose objects are list items that may be ``None`` (see
+    ``path_getter()``).
+    """
+    plan = []
+    for k, v in spec.items():
+        path = k if prefix is None else '{}.{}'.format(prefix, k)
+        path_getters = getters + (key(k),)
+        if isinstance(v, dict):
+            plan.extend(compile_plan(v, key, path, path_getters, stats,
+                                     scope, nested))
+            continue
+        getter = path_getter(path_getters, nested)
+        if is_spec_list(v):
+            item_scope = '{}{}.*.'.format(scope, path)
+            plan.append((path, getter, None,
+                         compile_plan(v[0], key, stats=stats,
+                                      scope=item_scope, nested=True)))
+        elif stats is None:
+            plan.append((path, getter, make_check(v), None))
+        else:
+            label = '{}{}'.format(scope, path)
+            check = make_check(v, stats, label + '/')
+            plan.append((path, getter, timed(check, label, stats), None))
+    return plan
+
+
+def run_plan(plan, obj, errors, max_errors, prefix=''):
+    """ Validate object using a plan and store errors in the errors dict
 
+    Values of lists of nested specs that are not lists (see
+    ``validators.validators.is_sequence()``) are reported as ``'listof'``
+    errors. Returns ``True`` if ``max_errors`` errors have been found.
+    """
+    for path, getter, check, subplan in plan:
+        value = getter(obj)
+        if subplan is not None:
+            if value is None:
+                continue
+            if not is_sequence(value):
+                errors['{}{}'.format(prefix, path) if prefix else path] = (
+                    ValidationError('Value must be a list.', 'listof'))
+                if len(errors) == max_errors:
+                    return True
+                continue
+            for i, item in enumerate(value):
+                item_prefix = '{}{}.{}.'.format(prefix, path, i)
+                if run_plan(subplan, item, errors, max_errors, item_prefix):
+                    return True
+            continue
+        result = check(value)
+        if isinstance(result, Invalid):
+            errors['{}{}'.format(prefix, path) if prefix else path] = (
+                result.error)
+            if len(errors) == max_errors:
+                return True
+    return False
+
+
+class PlanRanking(object):
+    """ Order of plan steps ranked by their cost and failure rate
+
+    Each step of the plan is timed, and its failures counted, when it is
+    run. Every ``interval`` validations, the steps are sorted by the expected
+    time spent on a step before it rejects the object (mean time divided by
+    the failure rate), so that cheap steps that often fail are run first,
+    and steps that have not been run yet are run first so that they are
+    measured. Steps that are not reached because validation stopped early
+    are not measured. After ``warmup`` validations (if specified), or when
+    ``freeze()`` or ``pin()`` is called, the order no longer changes and the
+    steps are no longer timed.
+
+    As with ``Ranking``, the order can be read from multiple threads without
+    locking, and counts may be slightly off when the ranking is updated from
+    multiple threads at once.
+    """
+
+    def __init__(self, steps, interval=100, warmup=None):
+        if interval < 1:
+            raise ValueError('interval must be at least 1')
+        self.steps = list(steps)
+        self.singles = [(step,) for step in self.steps]
+        count = len(self.steps)
+        self.order = tuple(range(count))
+        self.plan = self.steps
+        self.calls = [0] * count
+        self.failures = [0] * count
+        self.time = [0.0] * count
+        self.validations = 0
+        self.interval = interval
+        self.warmup = warmup
+        self.next_update = interval
+        self.frozen = False
+        self.lock = threading.Lock()
+
+    @property
+    def paths(self):
+        """ Paths of the steps in the current order """
+        return [step[0] for step in self.plan]
+
+    def score(self, index):
+        calls = self.calls[index]
+        if not calls:
+            return (0.0, index)
+        # Failure rate is smoothed, so steps that never failed are ordered
+        # by cost, and a few early failures do not decide the order
+        rate = (self.failures[index] + 1.0) / (calls + 2.0)
+        return (self.time[index] / calls / rate, index)
+
+    def set_order(self, order):
+        self.order = tuple(order)
+        self.plan = [self.steps[i] for i in self.order]
+
+    def update(self):
+        with self.lock:
+            if self.frozen:
+                return
+            self.set_order(sorted(range(len(self.steps)), key=self.score))
+            self.next_update = self.validations + self.interval
+            if self.warmup is not None and self.validations >= self.warmup:
+                self.frozen = True
+
+    def freeze(self):
+        """ Update the order one last time and keep it """
+        self.update()
+        self.frozen = True
+
+    def pin(self, paths):
+        """ Run the steps for ``paths`` first, in the given order, and keep it
+
+        Steps for other paths follow in their current order.
+        """
+        index = dict((step[0], i) for i, step in enumerate(self.steps))
+        unknown = [path for path in paths if path not in index]
+        if unknown:
+            raise ValueError('Unknown keys: {}'.format(
+                ', '.join(str(path) for path in unknown)))
+        first = [index[path] for path in paths]
+        with self.lock:
+            self.set_order(first + [i for i in self.order if i not in first])
+            self.frozen = True
 
-def spec_validator(spec, key=operator.itemgetter):
+    def run(self, obj, errors, max_errors):
+        """ Run the plan in the current order (see ``run_plan()``) """
+        if self.frozen:
+            return run_plan(self.plan, obj, errors, max_errors)
+        done = False
+        for i in self.order:
+            count = len(errors)
+            start = clock()
+            done = run_plan(self.singles[i], obj, errors, max_errors)
+            self.time[i] += clock() - start
+            self.calls[i] += 1
+            if len(errors) > count:
+                self.failures[i] += 1
+            if done:
+                break
+        self.validations += 1
+        if self.validations >= self.next_update:
+            self.update()
+        return done
+
+
+# Thread pool shared by spec validators with I/O-bound keys
+IO_WORKERS = 16
+io_pool = None
+io_pool_lock = threading.Lock()
+
+
+def io_executor():
+    """ Return the thread pool shared by spec validators with I/O-bound keys
+
+    The pool is created on first use, with at most ``IO_WORKERS`` threads.
+    """
+    global io_pool
+    if io_pool is None:
+        with io_pool_lock:
+            if io_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS)
+    return io_pool
+
+
+def split_plan(plan, io_bound):
+    """ Split steps of I/O-bound keys from the plan
+
+    Returns a ``(plan, threaded)`` tuple, where ``threaded`` is a list of
+    ``(path, getter, check)`` tuples for paths in ``io_bound``, and ``plan``
+    contains the remaining steps.
+    """
+    io_bound = set(io_bound)
+    inline = []
+    threaded = []
+    for path, getter, check, subplan in plan:
+        if path in io_bound and subplan is None:
+            threaded.append((path, getter, check))
+            io_bound.discard(path)
+        else:
+            inline.append((path, getter, check, subplan))
+    if io_bound:
+        raise ValueError('Unknown I/O-bound keys: {}'.format(
+            ', '.join(sorted(str(path) for path in io_bound))))
+    return inline, threaded
+
+
+def spec_validator(spec, key=operator.itemgetter, fail_fast=False,
+                   max_errors=None, stats=None, optimize=False,
+                   io_bound=None, executor=None, adaptive=False,
+                   interval=100, warmup=None):
     """ Take a spec in dict form, and return a function that validates objects
 
     The spec maps each object's key to a chain of validator functions.
@@ -52,18 +462,221 @@ def spec_validator(spec, key=operator.itemgetter):
     key from the object. By default, it uses ``operator.itemgetter``. It should
     be assigned a function that takes a key value and returns a function that
     returns the vale from an object that is passed to it.
+
+    A key can also map to a nested spec (a dict) which is used to validate the
+    value of the key, or to a list containing a single nested spec which is
+    used to validate each item of the list that is the value of the key.
+    Errors for nested keys are reported using dotted paths, such as
+    ``'foo.bar'`` and ``'foo.0.bar'`` (for the first item of the list). When
+    the value of a key with a nested spec (or an item of a list of nested
+    specs) is ``None`` or not a mapping, the nested keys are validated as if
+    they were ``None``. The items of ``None`` lists are not validated, and
+    values that are not lists are reported as ``'listof'`` errors. Nested
+    specs are compiled into a single flat plan when
+    ``spec_validator()`` is called (see ``compile_plan()``).
+
+    By default, all keys are validated and the errors for all invalid keys are
+    returned. If ``max_errors`` is specified, the validation stops as soon as
+    that many errors are found, and the remaining keys are not validated.
+    Passing ``fail_fast=True`` is the same as passing ``max_errors=1``. Keys
+    are validated in the order in which they appear in the spec.
+
+    If ``stats`` is specified (see ``validators.profiling.Stats``), the time
+    spent validating each key and in each validator of the key's chain, and
+    the failures, are recorded in it. Keys of items in lists of nested specs
+    are recorded with ``*`` in place of the item index (e.g.,
+    ``'items.*.id'``).
+
+    If ``optimize`` is ``True``, chains are simplified before they are
+    compiled (see ``validators.optimize.optimize()``).
+
+    Chains that wait for I/O (e.g., check whether a file exists or look up
+    a host name) can be run concurrently by passing their keys (or dotted
+    paths of nested keys) as ``io_bound``. Their values are read on the
+    calling thread, their chains are submitted to ``executor`` (by default,
+    a thread pool shared by all spec validators, see ``io_executor()``), and
+    the remaining chains are run on the calling thread while they wait. The
+    errors are collected in the same dict. Validators used in I/O-bound
+    chains must be safe to call from multiple threads. Keys in lists of
+    nested specs cannot be I/O-bound.
+
+    If ``adaptive=True`` is passed together with ``max_errors`` or
+    ``fail_fast``, the keys are reordered as the validator is used, so that
+    keys whose chains are cheap and often fail are validated first, and
+    invalid objects are rejected sooner (see ``PlanRanking``). The order is
+    updated every ``interval`` validations, and is frozen after ``warmup``
+    validations if specified. The returned validator's ``ranking`` attribute
+    has the current order of keys as ``paths``, and the ``freeze()`` and
+    ``pin(paths)`` methods that stop the reordering. Adaptive ordering does
+    not change whether an object is valid, but may change which errors are
+    reported when there are more than ``max_errors`` of them. I/O-bound keys
+    are not reordered.
     """
-    spec = {k: (key(k), make_chain(v)) for k, v in spec.items()}
+    if fail_fast:
+        max_errors = 1
+    if max_errors is not None and max_errors < 1:
+        raise ValueError('max_errors must be at least 1')
+    if optimize:
+        spec = optimize_spec(spec)
+    if adaptive and max_errors is None:
+        raise ValueError('adaptive ordering requires max_errors or fail_fast')
+    plan = compile_plan(spec, key, stats=stats)
+    threaded = ()
+    if io_bound:
+        plan, threaded = split_plan(plan, io_bound)
+
+    ranking = None
+    if adaptive:
+        ranking = PlanRanking(plan, interval, warmup)
+        run = ranking.run
+    else:
+        def run(obj, errors, max_errors):
+            return run_plan(plan, obj, errors, max_errors)
+
+    if threaded:
+        def validator(obj):
+            # All values are read before any chain is submitted, so a getter
+            # that raises does not leave chains running
+            values = [getter(obj) for _, getter, _ in threaded]
+            submit = (executor or io_executor()).submit
+            pending = []
+            errors = {}
+            try:
+                for (path, _, check), value in zip(threaded, values):
+                    pending.append((path, submit(check, value)))
+                if run(obj, errors, max_errors):
+                    return errors
+                for path, future in pending:
+                    result = future.result()
+                    if isinstance(result, Invalid):
+                        errors[path] = result.error
+                        if len(errors) == max_errors:
+                            break
+            finally:
+                # Chains that have not started are not needed anymore
+                for _, future in pending:
+                    future.cancel()
+            return errors
+        validator.ranking = ranking
+        return validator
+
+    if ranking is not None:
+        def validator(obj):
+            errors = {}
+            run(obj, errors, max_errors)
+            return errors
+        validator.ranking = ranking
+        return validator
+
+    if any(subplan is not None for _, _, _, subplan in plan):
+        def validator(obj):
+            errors = {}
+            run_plan(plan, obj, errors, max_errors)
+            return errors
+        return validator
+
+    flat = [(path, getter, check) for path, getter, check, _ in plan]
+
+    if max_errors is None:
+        def validator(obj):
+            errors = {}
+            for path, getter, check in flat:
+                result = check(getter(obj))
+                if isinstance(result, Invalid):
+                    errors[path] = result.error
+            return errors
+        return validator
 
     def validator(obj):
         errors = {}
-        for k, v in spec.items():
-            getter, chain = v
-            val = getter(obj)
-            try:
-                chain(val)
-            except ValueError as err:
-                errors[k] = err
+        for path, getter, check in flat:
+            result = check(getter(obj))
+            if isinstance(result, Invalid):
+                errors[path] = result.error
+                if len(errors) == max_errors:
+                    break
         return errors
-
     return validator
+
+
+class IncrementalValidator(object):
+    """ Validates a mutable object, revalidating only the keys that changed
+
+    Each top-level key of the spec is compiled into its own plan (see
+    ``compile_plan()``), and the errors found for each key are kept between
+    calls. When the validator is called with the keys that changed, only the
+    chains of those keys (including keys nested under them) are run, and the
+    errors for the remaining keys are reused.
+
+    When the changed keys are not specified, the value of each top-level key
+    is compared with the value it had in the previous call, and the keys
+    whose value is not the same object and is not equal are revalidated. The
+    previous values are not copied, so changes made in place to nested
+    values (e.g., appending to a list) are not noticed, and such keys must be
+    passed as changed.
+
+    The ``key``, ``stats`` and ``optimize`` arguments are the same as for
+    ``spec_validator()``. Since results of all keys are needed, the
+    validation never stops early.
+    """
+
+    def __init__(self, spec, key=operator.itemgetter, stats=None,
+                 optimize=False):
+        if optimize:
+            spec = optimize_spec(spec)
+        self.keys = list(spec)
+        self.getters = dict((k, key(k)) for k in self.keys)
+        self.plans = dict((k, compile_plan({k: spec[k]}, key, stats=stats))
+                          for k in self.keys)
+        self.results = {}
+        self.snapshot = None
+        self.errors = {}
+
+    def reset(self):
+        """ Forget the previous results, so that all keys are revalidated """
+        self.results = {}
+        self.snapshot = None
+        self.errors = {}
+
+    def diff(self, obj):
+        """ Return the keys whose values differ from the previous snapshot """
+        changed = []
+        snapshot = self.snapshot
+        for k in self.keys:
+            old, new = snapshot[k], self.getters[k](obj)
+            if old is new:
+                continue
+            try:
+                if old == new:
+                    continue
+            except Exception:
+                pass
+            changed.append(k)
+        return changed
+
+    def validate_key(self, k, obj):
+        errors = {}
+        run_plan(self.plans[k], obj, errors, None)
+        for path in self.results.get(k, ()):
+            del self.errors[path]
+        self.errors.update(errors)
+        self.results[k] = errors
+
+    def __call__(self, obj, changed=None):
+        """ Validate the object and return the errors for all keys
+
+        ``changed`` is an iterable of top-level keys whose values changed
+        since the previous call. Keys that are not in the spec are ignored.
+        All keys are validated on the first call and after ``reset()``.
+        """
+        if self.snapshot is None:
+            keys = self.keys
+            self.snapshot = {}
+        elif changed is None:
+            keys = self.diff(obj)
+        else:
+            keys = [k for k in changed if k in self.plans]
+        for k in keys:
+            self.validate_key(k, obj)
+            self.snapshot[k] = self.getters[k](obj)
+        return dict(self.errors)
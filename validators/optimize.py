@@ -0,0 +1,270 @@
+"""
+Simplification of chains of built-in validators
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from .chain import Validator, Signal
+
+
+# Validators that always give the same result for the same value, so a
+# second one in a chain segment is redundant
+PURE = ('required', 'nonempty', 'boolean', 'istype', 'instanceof', 'isin',
+        'gte', 'lte', 'match', 'url', 'timestamp', 'min_length', 'deprecated')
+
+# Cheap type checks that are moved ahead of expensive validators
+TYPE_CHECKS = ('istype', 'instanceof')
+
+# Validators that are expensive compared to type checks
+EXPENSIVE = ('match', 'url', 'timestamp')
+
+# Built-in validators that never change the value, so they can be removed or
+# moved relative to each other
+BUILTIN = PURE + ('optional', 'listof', 'range', 'match_all')
+
+# Name of the package that defines the built-in validators
+PACKAGE = __name__.split('.')[0]
+
+
+def code_of(fn):
+    """ Return the code of a built-in validator, or ``None``
+
+    Validators that have a code, but are not built-in validators (e.g.,
+    subclasses of ``validators.chain.Validator`` defined by applications),
+    may change the value, and are treated like any other validator.
+    """
+    code = getattr(fn, 'code', None)
+    if code not in BUILTIN:
+        return None
+    module = getattr(fn, '__module__', None) or ''
+    if module.split('.')[0] != PACKAGE:
+        return None
+    return code
+
+
+def segments(fns, barriers=()):
+    """ Split list of validators into segments of built-in validators
+
+    Each validator that is not a built-in validator (it may transform the
+    value), or whose code is in ``barriers``, is a segment of its own.
+    """
+    segment = []
+    for fn in fns:
+        code = code_of(fn)
+        if code is None or code in barriers:
+            if segment:
+                yield segment
+            yield [fn]
+            segment = []
+        else:
+            segment.append(fn)
+    if segment:
+        yield segment
+
+
+def same_params(a, b):
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        try:
+            if x is not y and not bool(x == y):
+                return False
+        except Exception:
+            return False
+    return True
+
+
+def implies(first, second):
+    """ Test whether passing ``first`` validator implies passing ``second`` """
+    code1, code2 = code_of(first), code_of(second)
+    if code1 == code2 and code1 in PURE:
+        return same_params(first.params, second.params)
+    if code2 == 'instanceof' and code1 in TYPE_CHECKS:
+        try:
+            return issubclass(first.params[0], second.params[0])
+        except TypeError:
+            return False
+    return False
+
+
+def drop_redundant(fns):
+    """ Remove validators implied by an earlier validator in the segment """
+    result = []
+    for segment in segments(fns):
+        kept = []
+        for fn in segment:
+            if not any(implies(prev, fn) for prev in kept):
+                kept.append(fn)
+        result.extend(kept)
+    return result
+
+
+def move_type_checks(fns):
+    """ Move type checks ahead of expensive validators
+
+    Type checks are only moved within segments that do not contain
+    ``optional`` validators, so the outcome of the chain does not change.
+    Only the error that is raised when the value fails both validators does.
+    """
+    result = []
+    for segment in segments(fns, barriers=('optional',)):
+        codes = [code_of(fn) for fn in segment]
+        first = next((i for i, code in enumerate(codes) if code in EXPENSIVE),
+                     None)
+        if first is None:
+            result.extend(segment)
+            continue
+        moved = [fn for fn, code in zip(segment[first:], codes[first:])
+                 if code in TYPE_CHECKS]
+        rest = [fn for fn, code in zip(segment[first:], codes[first:])
+                if code not in TYPE_CHECKS]
+        result.extend(segment[:first] + moved + rest)
+    return result
+
+
+def run_checks(fns, v):
+    """ Return the result of checks of the validators in order """
+    for fn in fns:
+        v = fn.check(v)
+        if isinstance(v, Signal):
+            return v
+    return v
+
+
+class Range(Validator):
+    """ Fused ``gte()`` and ``lte()`` validators
+
+    The value is compared with both bounds inline, and the checks of the
+    original validators are only called, in the original order, when it does
+    not pass (to obtain the error).
+    """
+
+    __slots__ = ('first', 'second', 'low', 'high')
+    fields = ('low', 'high')
+    code = 'range'
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+        if first.code == 'gte':
+            self.low, self.high = first.params[0], second.params[0]
+        else:
+            self.low, self.high = second.params[0], first.params[0]
+
+    def check(self, v):
+        try:
+            if v >= self.low and v <= self.high:
+                return v
+        except TypeError:
+            pass
+        return run_checks((self.first, self.second), v)
+
+    def __reduce__(self):
+        return (type(self), (self.first, self.second))
+
+
+class MatchAll(Validator):
+    """ Fused ``match()`` validators
+
+    The value is matched against all of the regexes inline, and the checks of
+    the original validators are only called when it does not pass.
+    """
+
+    __slots__ = ('fns', 'regexes')
+    code = 'match_all'
+
+    def __init__(self, fns):
+        self.fns = tuple(fns)
+        self.regexes = tuple(fn.params[0] for fn in self.fns)
+
+    @property
+    def params(self):
+        return self.regexes
+
+    def check(self, s):
+        try:
+            for regex in self.regexes:
+                if not regex.match(s):
+                    break
+            else:
+                return s
+        except TypeError:
+            pass
+        return run_checks(self.fns, s)
+
+    def __reduce__(self):
+        return (type(self), (self.fns,))
+
+
+def fuse(fns):
+    """ Fuse adjacent ``gte()`` and ``lte()``, and adjacent ``match()`` """
+    result = []
+    i = 0
+    while i < len(fns):
+        fn = fns[i]
+        code = code_of(fn)
+        nxt = code_of(fns[i + 1]) if i + 1 < len(fns) else None
+        if (code, nxt) in (('gte', 'lte'), ('lte', 'gte')):
+            result.append(Range(fn, fns[i + 1]))
+            i += 2
+            continue
+        if code == 'match' and nxt == 'match':
+            end = i
+            while end < len(fns) and code_of(fns[end]) == 'match':
+                end += 1
+            result.append(MatchAll(fns[i:end]))
+            i = end
+            continue
+        result.append(fn)
+        i += 1
+    return result
+
+
+def optimize(fns):
+    """ Return a simplified list of chainable validators
+
+    Built-in validators are recognized by their ``code`` and ``params``
+    attributes (see ``validators.chain.Validator``) and the module that
+    defines them. Other validators, including application validators that
+    have a ``code``, are left as they are, and built-in validators are never
+    moved across them, as they may change the value. The following rewrites
+    are done:
+
+    - validators that are implied by an earlier validator in the segment
+      (e.g., a second ``istype(int)``) are removed
+    - ``istype()`` and ``instanceof()`` are moved ahead of ``match()``,
+      ``url`` and ``timestamp()``
+    - adjacent ``gte()`` and ``lte()`` are fused into a single range check
+    - adjacent ``match()`` validators are fused into a single validator
+
+    Whether a value passes the chain does not change, but when a value fails
+    more than one validator, a different error may be raised because of
+    reordering. Use ``dump()`` to see the result.
+    """
+    return fuse(move_type_checks(drop_redundant(list(fns))))
+
+
+def describe_link(fn):
+    """ Return a string representation of a chainable validator """
+    code = code_of(fn)
+    if code is None:
+        return '{} (opaque)'.format(getattr(fn, '__name__', repr(fn)))
+    params = getattr(fn, 'params', ())
+    if not params:
+        return code
+    return '{}({})'.format(code, ', '.join(repr(p) for p in params))
+
+
+def dump(fns):
+    """ Return a list of validators as text, one validator per line
+
+    The list can be a list of chainable validators, or a chain returned by
+    ``make_chain()``.
+    """
+    fns = getattr(fns, 'fns', fns)
+    return '\n'.join('{}: {}'.format(i, describe_link(fn))
+                     for i, fn in enumerate(fns))
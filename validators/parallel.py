@@ -0,0 +1,98 @@
+"""
+Validation of large record sets using a pool of processes
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import operator
+import itertools
+import multiprocessing
+
+from .helpers import spec_validator
+
+
+CHUNKSIZE = 1000
+
+# Validator used by the worker process, set up by ``init_worker()``
+worker_validator = None
+
+
+def get_context():
+    """ Return multiprocessing context which starts workers by forking
+
+    Forked workers inherit the spec from the parent process, so validators
+    that cannot be pickled (e.g., custom validators defined as closures) can
+    be used. If forking is not supported on the platform, the default
+    context is used.
+    """
+    try:
+        return multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        return multiprocessing
+
+
+def init_worker(spec, key):
+    global worker_validator
+    if hasattr(spec, '__call__'):
+        spec = spec()
+    worker_validator = spec_validator(spec, key=key)
+
+
+def validate_chunk(chunk):
+    start, records = chunk
+    failed = []
+    for index, record in enumerate(records, start):
+        errors = worker_validator(record)
+        if errors:
+            failed.append((index, errors))
+    return failed
+
+
+def chunks(records, size):
+    """ Split an iterable into ``(start_index, list)`` chunks of given size """
+    records = iter(records)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def validate_parallel(spec, records, key=operator.itemgetter, processes=None,
+                      chunksize=CHUNKSIZE):
+    """ Validate records against a spec using a pool of worker processes
+
+    ``spec`` is either a spec dict as accepted by ``spec_validator()``, or a
+    function that takes no arguments and returns the spec. The validator is
+    built from the spec in each of the workers, so that the validators
+    themselves do not need to be sent to the workers. When workers cannot be
+    started by forking the current process, the spec (or the function that
+    returns it) must be picklable. Module-level functions are picklable, so a
+    function that returns the spec can always be used.
+
+    ``records`` is a list or any other iterable of records. It is consumed
+    lazily in chunks of ``chunksize`` records which are validated by
+    ``processes`` workers (defaults to number of CPUs). Records must be
+    picklable.
+
+    The return value is a dict that maps index of each invalid record to the
+    dict of errors returned by the spec validator.
+    """
+    pool = get_context().Pool(processes, init_worker, (spec, key))
+    try:
+        errors = {}
+        for failed in pool.imap(validate_chunk, chunks(records, chunksize)):
+            errors.update(failed)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return errors
@@ -0,0 +1,239 @@
+"""
+Persisted spec validators
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import os
+import re
+import sys
+import pickle
+import hashlib
+import operator
+import platform
+
+from .chain import Validator
+from .codegen import dump_code, load_code
+from .helpers import spec_validator
+from .re_patterns import LazyPattern
+
+try:
+    import _sre
+    try:
+        from re import _compiler as sre_compile, _parser as sre_parse
+    except ImportError:
+        import sre_compile
+        import sre_parse
+except ImportError:
+    _sre = None
+
+
+# Version of the plan file format
+FORMAT = 2
+
+# Generated code is stored as marshalled code objects, and regular
+# expressions as compiled SRE code, which can only be loaded by the same
+# version of the interpreter
+PYTHON = (platform.python_implementation(), tuple(sys.version_info[:2]),
+          getattr(_sre, 'MAGIC', None))
+
+# Type of compiled regular expressions
+PATTERN = type(re.compile(''))
+
+
+def name_of(obj):
+    return '{}.{}'.format(getattr(obj, '__module__', '?'),
+                          getattr(obj, '__qualname__', obj.__name__))
+
+
+def canonical(obj):
+    """ Return a string that describes the spec or a part of it
+
+    The string is the same for equal specs built in different processes, so
+    unordered collections are sorted, and objects that do not have a useful
+    representation are described by name. Validators created with the
+    ``validators.chain.Validator`` class are described by their class and
+    parameters, and chains returned by ``make_chain()`` by their validators.
+    Other validators are described by name only, so changes to their
+    parameters (e.g., in closures) are not reflected.
+    """
+    if isinstance(obj, dict):
+        items = sorted('{}: {}'.format(canonical(k), canonical(v))
+                       for k, v in obj.items())
+        return '{' + ', '.join(items) + '}'
+    if isinstance(obj, (list, tuple)):
+        return '[' + ', '.join(canonical(v) for v in obj) + ']'
+    if isinstance(obj, (set, frozenset)):
+        return 'set(' + ', '.join(sorted(canonical(v) for v in obj)) + ')'
+    if isinstance(obj, Validator):
+        return '{}({})'.format(name_of(type(obj)), canonical(obj.params))
+    fns = getattr(obj, 'fns', None)
+    if fns is not None and hasattr(obj, 'check'):
+        return 'chain({})'.format(canonical(list(fns)))
+    if hasattr(obj, 'pattern') and hasattr(obj, 'match'):
+        return 're({!r}, {})'.format(obj.pattern, getattr(obj, 'flags', 0))
+    if isinstance(obj, type) or hasattr(obj, '__call__'):
+        return name_of(obj)
+    return repr(obj)
+
+
+def spec_fingerprint(spec):
+    """ Return a fingerprint of the spec
+
+    The fingerprint changes when keys, validators or their parameters change.
+    See ``canonical()`` for details.
+    """
+    return hashlib.sha1(canonical(spec).encode('utf8')).hexdigest()
+
+
+def compiled_regex(pattern, flags, state):
+    """ Return a compiled regular expression saved by ``reduce_regex()``
+
+    The regex is created from the saved SRE code without parsing and
+    compiling the pattern, which is most of the cost of ``re.compile()``.
+    If that is not possible, the pattern is compiled again.
+    """
+    if state is not None:
+        try:
+            return _sre.compile(pattern, *state)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
+
+def reduce_regex(regex):
+    """ Reduce a regex so that it is unpickled without compiling it again """
+    if isinstance(regex, LazyPattern):
+        regex = regex.compile()
+    pattern, flags = regex.pattern, regex.flags
+    state = None
+    if _sre is not None:
+        try:
+            parsed = sre_parse.parse(pattern, flags)
+            groupindex = dict(parsed.state.groupdict)
+            indexgroup = [None] * parsed.state.groups
+            for name, index in groupindex.items():
+                indexgroup[index] = name
+            state = (flags | parsed.state.flags,
+                     [int(op) for op in sre_compile._code(parsed, flags)],
+                     parsed.state.groups - 1, groupindex, tuple(indexgroup))
+            # Only use the state if it reproduces the regex
+            compiled_regex(pattern, flags, state)
+        except Exception:
+            state = None
+    return (compiled_regex, (pattern, flags, state))
+
+
+def save_plan(path, spec, fingerprint=None, key=operator.itemgetter,
+              **options):
+    """ Build a spec validator and save it to a file
+
+    The spec, the code generated for its chains, the key function and the
+    options passed to ``spec_validator()`` are pickled into the file, with
+    the ``fingerprint`` (see ``spec_fingerprint()``), so that the validator
+    can be loaded using ``load_plan()`` without building it.
+
+    The spec and key function must be picklable. Validators created with the
+    ``validators.chain.Validator`` class (including all built-in validators)
+    and functions defined at module level are picklable. Regular
+    expressions are saved with their compiled code, so loading the plan does
+    not compile them again. Returns the validator.
+    """
+    validator = spec_validator(spec, key=key, **options)
+    write_plan(path, spec, fingerprint, key, options)
+    return validator
+
+
+def write_plan(path, spec, fingerprint, key, options):
+    """ Write a plan file for a validator built by ``save_plan()``
+
+    The file is written to a temporary file first, which replaces the file
+    at ``path`` when it is complete, and is removed if it cannot be written
+    (e.g., because the spec cannot be pickled).
+    """
+    data = {
+        'format': FORMAT,
+        'python': PYTHON,
+        'fingerprint': fingerprint or spec_fingerprint(spec),
+        'spec': spec,
+        'key': key,
+        'options': options,
+        'code': dump_code(),
+    }
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+            pickler.dispatch_table = {PATTERN: reduce_regex,
+                                      LazyPattern: reduce_regex}
+            pickler.dump(data)
+        if hasattr(os, 'replace'):
+            os.replace(tmp, path)
+        else:
+            os.rename(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load_plan(path, fingerprint, key=operator.itemgetter, **options):
+    """ Load a spec validator saved by ``save_plan()``
+
+    The validator is only loaded if the file was saved with the same
+    fingerprint, key function and options, by the same version of Python.
+    Otherwise, or if the file does not exist or cannot be read, ``None`` is
+    returned.
+
+    The file is unpickled, so only files written by trusted code should be
+    loaded.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError, ValueError,
+            TypeError, AttributeError, ImportError):
+        return None
+    if (not isinstance(data, dict) or data.get('format') != FORMAT or
+            data.get('python') != PYTHON or
+            data.get('fingerprint') != fingerprint or
+            data.get('key') != key or data.get('options') != options):
+        return None
+    load_code(data['code'])
+    return spec_validator(data['spec'], key=key, **options)
+
+
+def cached_spec_validator(path, spec, fingerprint=None,
+                          key=operator.itemgetter, **options):
+    """ Return a spec validator, loading it from file if possible
+
+    ``spec`` is either a spec, or a function that takes no arguments and
+    returns the spec. If ``fingerprint`` is specified (e.g., a version of the
+    spec), and the file at ``path`` was saved with the same fingerprint, the
+    validator is loaded from the file without calling the function.
+    Otherwise, the fingerprint is calculated from the spec. When the file is
+    missing or stale, the validator is built and saved to the file. If the
+    spec cannot be pickled (e.g., it contains chains returned by
+    ``make_chain()``), the built validator is returned without saving it.
+    """
+    if fingerprint is None:
+        if hasattr(spec, '__call__'):
+            spec = spec()
+        fingerprint = spec_fingerprint(spec)
+    validator = load_plan(path, fingerprint, key=key, **options)
+    if validator is not None:
+        return validator
+    if hasattr(spec, '__call__'):
+        spec = spec()
+    validator = spec_validator(spec, key=key, **options)
+    try:
+        write_plan(path, spec, fingerprint, key, options)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        pass
+    return validator
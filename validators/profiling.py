@@ -0,0 +1,130 @@
+"""
+Timing statistics for chains and specs
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import timeit
+import threading
+
+from .chain import Invalid
+
+
+clock = timeit.default_timer
+
+
+def error_code(err):
+    """ Return the code of a validation error, or ``None`` if it has none """
+    code = getattr(err, 'code', None)
+    if code is None and len(err.args) > 1:
+        code = err.args[1]
+    return code
+
+
+def link_name(fn):
+    """ Return a name for chainable validator used in labels """
+    return getattr(fn, 'code', None) or getattr(fn, '__name__', None) or '?'
+
+
+class Record(object):
+    """ Statistics for a single label """
+
+    __slots__ = ('calls', 'total', 'max', 'failures')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.failures = {}
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls else 0.0
+
+    def __repr__(self):
+        return ('Record(calls={}, total={:.6f}, max={:.6f}, '
+                'failures={!r})'.format(self.calls, self.total, self.max,
+                                        self.failures))
+
+
+class Stats(object):
+    """ Collects timing statistics of instrumented chains and specs
+
+    An instance is passed as ``stats`` argument to ``make_chain()`` or
+    ``spec_validator()``, and records, for each label, the number of calls,
+    the cumulative and maximum time spent in the call, and the number of
+    failures for each error code.
+
+    Labels are strings. Links of a chain are labelled ``'<index>:<name>'``,
+    where name is the validator's error code or function name (e.g.,
+    ``'1:istype'``). Spec keys are labelled with the key (or dotted path for
+    nested keys) and the links of the key's chain with
+    ``'<key>/<index>:<name>'``.
+
+    Any object that has a ``record(label, elapsed, result)`` method can be
+    used instead of ``Stats`` to receive each measurement as it is taken.
+
+    Recording is safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def record(self, label, elapsed, result):
+        """ Record a call that took ``elapsed`` seconds and returned result
+
+        ``result`` is the return value of the check (see
+        ``validators.chain.as_check()``), so ``Invalid`` results are counted
+        as failures.
+        """
+        with self.lock:
+            rec = self.records.get(label)
+            if rec is None:
+                rec = self.records[label] = Record()
+            rec.calls += 1
+            rec.total += elapsed
+            if elapsed > rec.max:
+                rec.max = elapsed
+            if isinstance(result, Invalid):
+                code = error_code(result.error)
+                rec.failures[code] = rec.failures.get(code, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def top(self, n=None, by='total'):
+        """ Return ``(label, record)`` pairs sorted by ``by``, descending """
+        with self.lock:
+            items = list(self.records.items())
+        items.sort(key=lambda item: getattr(item[1], by), reverse=True)
+        return items[:n]
+
+    def report(self, n=None, by='total'):
+        """ Return the statistics formatted as a text table """
+        lines = ['{:<40}{:>10}{:>12}{:>12}{:>12}  {}'.format(
+            'label', 'calls', 'total ms', 'mean us', 'max us', 'failures')]
+        for label, rec in self.top(n, by):
+            failures = ', '.join('{}={}'.format(code, count) for code, count
+                                 in sorted(rec.failures.items(), key=str))
+            lines.append('{:<40}{:>10}{:>12.3f}{:>12.3f}{:>12.3f}  {}'.format(
+                str(label), rec.calls, rec.total * 1e3, rec.mean * 1e6,
+                rec.max * 1e6, failures))
+        return '\n'.join(lines)
+
+
+def timed(check, label, stats):
+    """ Return a version of check that records its timing in stats """
+    record = stats.record
+
+    def timed_check(v):
+        start = clock()
+        result = check(v)
+        record(label, clock() - start, result)
+        return result
+    return timed_check
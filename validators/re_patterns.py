@@ -8,16 +8,103 @@ This software is free software licensed under the terms of GPLv3. See COPYING
 file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 """
 
-import re
 
+class LazyPattern(object):
+    """ Regular expression that is compiled when it is first used
 
-URL_RE = re.compile(
-    r'^'
+    The pattern is compiled (and the ``re`` module imported) on first access
+    to any of the compiled pattern's attributes, such as ``match``. The
+    attributes are then stored on the instance, so later access is as fast as
+    with a compiled pattern. Flags can be specified inline (e.g., ``(?i)``)
+    or as ``re`` flag values.
+    """
+
+    def __init__(self, pattern, flags=0):
+        self._pattern = pattern
+        self._flags = flags
+        self._compiled = None
+
+    def compile(self):
+        if self._compiled is None:
+            import re
+            self._compiled = re.compile(self._pattern, self._flags)
+        return self._compiled
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        value = getattr(self.compile(), name)
+        setattr(self, name, value)
+        return value
+
+    def __reduce__(self):
+        return (type(self), (self._pattern, self._flags))
+
+    def __repr__(self):
+        return 'LazyPattern({!r})'.format(self._pattern)
+
+
+def bytes_pattern(regex):
+    """ Return a version of a text pattern that matches bytes-like objects
+
+    Bytes patterns match ``bytes``, ``bytearray``, ``memoryview`` and
+    ``mmap`` objects (and slices of memory views) in place, without decoding
+    or copying them. Character classes such as ``\\d`` and ``\\S`` only
+    match ASCII characters in bytes patterns. Patterns that contain non-ASCII
+    characters cannot be converted, and ``None`` is returned for them. Bytes
+    patterns are returned as they are.
+    """
+    if isinstance(regex, LazyPattern):
+        pattern, flags = regex._pattern, regex._flags
+    else:
+        pattern, flags = regex.pattern, regex.flags
+    if isinstance(pattern, bytes):
+        return regex
+    try:
+        pattern = pattern.encode('ascii')
+    except UnicodeError:
+        return None
+    if flags:
+        import re
+        flags &= ~re.UNICODE
+    return LazyPattern(pattern, flags)
+
+
+URL_RE = LazyPattern(
+    r'(?i)^'
     r'(?:[a-z]+)://'  # scheme...
     r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|'  # domain...
     r'localhost|'  # localhost...
     r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
     r'(?::\d+)?'  # optional port
     r'(?:/?|[/?]\S+)'
-    r'$', re.IGNORECASE)
+    r'$')
+
+URL_BYTES_RE = bytes_pattern(URL_RE)
+
+# The following patterns are used by ``validators.urls.is_url()`` to match
+# the same URLs as ``URL_RE`` in linear time.
+
+# Scheme and host part of URL. The host is matched as a run of characters that
+# can appear in domain names and IP addresses. The run is matched at the end of
+# the pattern, so it is never backtracked.
+URL_HOST_RE = LazyPattern(r'(?i)(?:[a-z]+)://([A-Z0-9\d.-]*)')
+
+# Optional port and path that follow the host
+URL_PORT_RE = LazyPattern(r':\d+')
+URL_PATH_RE = LazyPattern(r'(?:/?|[/?]\S+)$')
+
+# Versions of the above for bytes-like objects
+URL_HOST_BYTES_RE = bytes_pattern(URL_HOST_RE)
+URL_PORT_BYTES_RE = bytes_pattern(URL_PORT_RE)
+URL_PATH_BYTES_RE = bytes_pattern(URL_PATH_RE)
+
+# Labels of a domain name with a dot after each label (the labels are also
+# tested not to start or end with a hyphen)
+LABELS_RE = LazyPattern(r'(?i)(?:[A-Z0-9-]{1,63}\.)+$')
+
+TLD_RE = LazyPattern(r'(?i)[A-Z0-9-]{2,}$')
+
+LOCALHOST_RE = LazyPattern(r'(?i)localhost$')
 
+IPV4_RE = LazyPattern(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$')
@@ -0,0 +1,175 @@
+"""
+Validation of records read from JSON Lines and CSV files
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import io
+import csv
+import json
+
+from .chain import ValidationError
+
+
+BUFFER_SIZE = 1024 * 1024
+
+# Key in the errors dict of records that could not be parsed
+RECORD_KEY = '__record__'
+
+# Options of ``csv.DictReader`` and ``csv.DictWriter`` that the other class
+# does not accept
+READER_OPTIONS = ('restkey',)
+WRITER_OPTIONS = ('extrasaction',)
+
+
+class MalformedRecord(object):
+    """ Line of the source that could not be parsed as a record
+
+    The original ``line`` is kept, so it can be written to the sink as is,
+    and ``error`` is the ``ValidationError`` reported for the line.
+    """
+
+    __slots__ = ('line', 'error')
+
+    def __init__(self, line, error):
+        self.line = line
+        self.error = error
+
+    def __repr__(self):
+        return 'MalformedRecord({!r})'.format(self.line)
+
+
+class JSONLinesFormat(object):
+    """ Reads and writes records stored as one JSON object per line """
+
+    def read(self, f):
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as err:
+                record = MalformedRecord(line, ValidationError(
+                    'malformed record: {error}', 'malformed',
+                    error=str(err)))
+            else:
+                if not isinstance(record, dict):
+                    record = MalformedRecord(line, ValidationError(
+                        'malformed record: expected an object, got '
+                        '{rtype.__name__}', 'malformed', rtype=type(record)))
+            yield line_no, record
+
+    def writer(self, sink):
+        def write(record):
+            if isinstance(record, MalformedRecord):
+                line = record.line
+                sink.write(line if line.endswith('\n') else line + '\n')
+                return
+            sink.write(json.dumps(record) + '\n')
+        return write
+
+
+class CSVFormat(object):
+    """ Reads and writes records stored as CSV rows with a header row
+
+    Values of rows that have more fields than the header are stored under
+    the ``restkey`` of the reader (``None`` by default), and are written
+    after the other fields.
+    """
+
+    def __init__(self, **fmtparams):
+        self.restkey = fmtparams.get('restkey')
+        self.reader_params = dict((k, v) for k, v in fmtparams.items()
+                                  if k not in WRITER_OPTIONS)
+        self.writer_params = dict((k, v) for k, v in fmtparams.items()
+                                  if k not in READER_OPTIONS)
+        self.fieldnames = None
+
+    def read(self, f):
+        reader = csv.DictReader(f, **self.reader_params)
+        for record in reader:
+            self.fieldnames = reader.fieldnames
+            yield reader.line_num, record
+
+    def writer(self, sink):
+        state = {}
+
+        def write(record):
+            if 'writer' not in state:
+                writer = csv.DictWriter(sink, self.fieldnames,
+                                        **self.writer_params)
+                writer.writeheader()
+                state['writer'] = writer
+            writer = state['writer']
+            rest = record.get(self.restkey)
+            if isinstance(rest, list):
+                # Extra values are written as they were read, which
+                # ``DictWriter`` does not support
+                writer.writer.writerow(
+                    [record.get(k, writer.restval) for k in self.fieldnames] +
+                    rest)
+                return
+            writer.writerow(record)
+        return write
+
+
+FORMATS = {
+    'jsonl': JSONLinesFormat,
+    'csv': CSVFormat,
+}
+
+
+def validate_stream(validator, source, format='jsonl', sink=None,
+                    buffer_size=BUFFER_SIZE, encoding='utf8', **fmtparams):
+    """ Validate records read from a file one by one
+
+    ``validator`` is a function returned by ``spec_validator()``. ``source``
+    is either a path or a file object opened in text mode. When a path is
+    passed, the file is opened with a read buffer of ``buffer_size`` bytes
+    and closed once the generator is exhausted or closed.
+
+    ``format`` is either ``'jsonl'`` (one JSON object per line) or ``'csv'``
+    (rows with a header row). Any additional keyword arguments are passed to
+    ``csv.DictReader`` and ``csv.DictWriter`` for CSV files, except that
+    ``restkey`` is only passed to the reader, and ``extrasaction`` only to
+    the writer.
+
+    This function is a generator that yields ``(line_no, record, errors)``
+    tuples, where ``errors`` is the dict returned by the validator. Records
+    are read and validated lazily, so only one record is kept in memory at a
+    time.
+
+    If ``sink`` is a file object, records that fail to validate are written
+    to it in the same format as the source.
+
+    Lines of JSON Lines files that are not valid JSON, or are not JSON
+    objects, do not stop the validation. They are yielded as
+    ``MalformedRecord`` objects, with errors that map ``RECORD_KEY`` to a
+    ``'malformed'`` error, and are written to the sink as they are.
+    """
+    try:
+        fmt = FORMATS[format](**fmtparams)
+    except KeyError:
+        raise ValueError("unknown format '{}'".format(format))
+    write = fmt.writer(sink) if sink is not None else None
+    if hasattr(source, 'read'):
+        f = source
+    else:
+        f = io.open(source, 'r', buffering=buffer_size, encoding=encoding,
+                    newline='')
+    try:
+        for line_no, record in fmt.read(f):
+            if isinstance(record, MalformedRecord):
+                errors = {RECORD_KEY: record.error}
+            else:
+                errors = validator(record)
+            if errors and write is not None:
+                write(record)
+            yield line_no, record, errors
+    finally:
+        if f is not source:
+            f.close()
@@ -0,0 +1,115 @@
+"""
+Fast matching of timestamps against strptime() format strings
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+import re
+import sys
+import calendar
+import datetime
+
+
+# Patterns used by ``datetime.strptime()`` for directives whose meaning does
+# not depend on the locale
+DIRECTIVES = {
+    'Y': r'(?P<Y>\d\d\d\d)',
+    'm': r'(?P<m>1[0-2]|0[1-9]|[1-9])',
+    'd': r'(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])',
+    'H': r'(?P<H>2[0-3]|[0-1]\d|\d)',
+    'M': r'(?P<M>[0-5]\d|\d)',
+    'S': r'(?P<S>6[0-1]|[0-5]\d|\d)',
+    'f': r'(?P<f>[0-9]{1,6})',
+    '%': '%',
+}
+
+if sys.version_info >= (3, 7):
+    # Older versions do not support colons and 'Z' in %z
+    DIRECTIVES['z'] = (r'(?P<z>[+-]\d\d:?[0-5]\d(:?[0-5]\d(\.\d{1,6})?)?'
+                       r'|(?-i:Z))')
+
+TOKEN_RE = re.compile(r'%(.)|(\s+)|([^%\s]+)|(%$)', re.DOTALL)
+
+
+def compile_pattern(fmt):
+    """ Return regex pattern for format, or ``None`` if not supported """
+    parts = []
+    seen = set()
+    for directive, space, literal, stray in TOKEN_RE.findall(fmt):
+        if stray:
+            return None
+        if directive:
+            if directive not in DIRECTIVES or directive in seen:
+                return None
+            if directive != '%':
+                seen.add(directive)
+            parts.append(DIRECTIVES[directive])
+        elif space:
+            parts.append(r'\s+')
+        else:
+            parts.append(re.escape(literal))
+    return ''.join(parts)
+
+
+def valid_offset(z):
+    """ Test whether %z value can be converted to a valid UTC offset """
+    if z == 'Z':
+        return True
+    colon = z[3] == ':'
+    seconds = z[6:] if colon else z[5:]
+    if seconds and (seconds[0] == ':') != colon:
+        # Colons must be used consistently
+        return False
+    return int(z[1:3]) < 24
+
+
+def compile_format(fmt):
+    """ Return a function that tests whether string matches the format
+
+    The returned function returns ``True`` if and only if
+    ``datetime.datetime.strptime()`` would successfully parse the string
+    using the same format. For formats that only use locale-independent
+    numeric directives (``%Y``, ``%m``, ``%d``, ``%H``, ``%M``, ``%S``,
+    ``%f``, ``%z``), the format is compiled into a regular expression once,
+    and the string is matched against it without constructing a ``datetime``
+    object. For other formats, ``strptime()`` is used.
+    """
+    pattern = compile_pattern(fmt)
+    if pattern is None:
+        def matches(s):
+            try:
+                datetime.datetime.strptime(s, fmt)
+            except ValueError:
+                return False
+            return True
+        return matches
+
+    regex = re.compile(pattern, re.IGNORECASE)
+    has_year = 'Y' in regex.groupindex
+    has_month = 'm' in regex.groupindex
+    has_day = 'd' in regex.groupindex
+    has_second = 'S' in regex.groupindex
+    has_offset = 'z' in regex.groupindex
+
+    def matches(s):
+        found = regex.match(s)
+        if found is None or found.end() != len(s):
+            return False
+        year = int(found.group('Y')) if has_year else 1900
+        if year < 1:
+            return False
+        if has_second and int(found.group('S')) > 59:
+            return False
+        if has_day:
+            month = int(found.group('m')) if has_month else 1
+            if int(found.group('d')) > calendar.monthrange(year, month)[1]:
+                return False
+        if has_offset and not valid_offset(found.group('z')):
+            return False
+        return True
+
+    return matches
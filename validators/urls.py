@@ -0,0 +1,71 @@
+"""
+Linear-time URL matching
+
+Copyright 2015, Outernet Inc.
+Some rights reserved.
+
+This software is free software licensed under the terms of GPLv3. See COPYING
+file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
+"""
+
+from .re_patterns import (URL_HOST_RE, URL_PORT_RE, URL_PATH_RE, LABELS_RE,
+                          TLD_RE, LOCALHOST_RE, IPV4_RE, URL_HOST_BYTES_RE,
+                          URL_PORT_BYTES_RE, URL_PATH_BYTES_RE)
+
+# Type of text strings, which are matched with text patterns
+TEXT = type(u'')
+
+
+def is_domain(host):
+    """ Test whether host is a domain name with at least two labels """
+    if host.endswith('.'):
+        host = host[:-1]
+    split = host.rfind('.') + 1
+    labels = host[:split]
+    return bool(split and LABELS_RE.match(labels) and
+                TLD_RE.match(host[split:]) and labels[0] != '-' and
+                '.-' not in labels and '-.' not in labels)
+
+
+def is_host(host):
+    return bool(is_domain(host) or LOCALHOST_RE.match(host) or
+                IPV4_RE.match(host))
+
+
+def is_url(s):
+    """ Test whether a string is a URL
+
+    This function accepts exactly the same strings as ``URL_RE`` in the
+    ``validators.re_patterns`` module, but runs in time linear to the length
+    of the string regardless of its contents. The string is matched part by
+    part (scheme and host, port, path) with patterns that end in a single
+    repetition, so no part is backtracked into when the following part does
+    not match. The host name is then tested with patterns whose repetitions
+    are separated by dots.
+
+    Bytes-like objects (``bytes``, ``bytearray``, ``memoryview`` and
+    ``mmap``) are matched in place using bytes versions of the patterns. Only
+    the host name, which consists of ASCII characters, is copied. Other
+    values that are not strings are not URLs.
+    """
+    if isinstance(s, TEXT):
+        host_re, port_re, path_re = URL_HOST_RE, URL_PORT_RE, URL_PATH_RE
+    else:
+        host_re, port_re, path_re = (URL_HOST_BYTES_RE, URL_PORT_BYTES_RE,
+                                     URL_PATH_BYTES_RE)
+    try:
+        head = host_re.match(s)
+    except TypeError:
+        return False
+    if head is None:
+        return False
+    host = head.group(1)
+    if isinstance(host, bytes):
+        host = host.decode('ascii')
+    if not is_host(host):
+        return False
+    end = head.end()
+    port = port_re.match(s, end)
+    if port is not None:
+        end = port.end()
+    return path_re.match(s, end) is not None
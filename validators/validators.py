@@ -8,162 +8,387 @@ This software is free software licensed under the terms of GPLv3. See COPYING
 file that comes with the source code, or http://www.gnu.org/licenses/gpl.txt.
 """
 
-import re
-import datetime
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
-from .re_patterns import URL_RE
-from .chain import chainable, ReturnEarly
+from .urls import is_url
+from .chain import (chainable, checkable, described, as_check, make_chain,
+                    Validator, ReturnEarly, STOP, Signal, Invalid, invalid,
+                    ValidationError)
+from .batch import describe, load_numpy
+from .re_patterns import LazyPattern, bytes_pattern
 
-RELPATH_RE = re.compile(r'^[^/]+(/[^/]+)*$')
+RELPATH_RE = LazyPattern(r'^[^/]+(/[^/]+)*$')
 
+# Sequences of characters and bytes are not treated as lists of items
+TEXT_TYPES = (str, bytes, bytearray, type(u''))
 
-def optional(default=None):
-    @chainable
-    def validator(s):
-        if s in [None, default]:
-            raise ReturnEarly()
+# Type of text strings, other values are matched with bytes patterns
+TEXT = type(u'')
+
+
+class Optional(Validator):
+    __slots__ = fields = ('default',)
+    code = 'optional'
+
+    def __init__(self, default=None):
+        self.default = default
+
+    def check(self, s):
+        if s in [None, self.default]:
+            return STOP
         return s
-    return validator
 
 
-@chainable
+def optional(default=None):
+    return Optional(default)
+
+
+@described('required')
+@checkable
 def required(s):
     if s is None:
-        raise ValueError('value is required', 'required')
+        return invalid('value is required', 'required')
     return s
 
 
-@chainable
+@described('nonempty')
+@checkable
 def nonempty(s):
     if s in ['', [], {}]:
-        seqtype = type(s)
-        raise ValueError('value cannot be an empty {}'.format(seqtype),
-                         'nonempty')
+        return invalid('value cannot be an empty {seqtype}',
+                       'nonempty', seqtype=type(s))
     return s
 
 
-@chainable
+@described('boolean')
+@checkable
 def boolean(v):
     if v not in [True, False]:
-        raise ValueError('{} must be True or False'.format(v),
-                         'boolean')
+        return invalid('{value} must be True or False', 'boolean',
+                       value=v)
     return v
 
 
-@chainable
+@described('deprecated')
+@checkable
 def deprecated(k):
     if k is not None:
-        raise ValueError('Key is deprecated, remove it or ignore this error',
-                         'deprecated')
+        return invalid('Key is deprecated, remove it or ignore this '
+                       'error', 'deprecated')
     return k
 
 
+class InstanceOf(Validator):
+    __slots__ = fields = ('t',)
+    code = 'instanceof'
+
+    def __init__(self, t):
+        self.t = t
+
+    def check(self, v):
+        if not isinstance(v, self.t):
+            return invalid('value must be an instance of '
+                           '{t.__name__}, was {vtype.__name__}',
+                           'instanceof', t=self.t, vtype=type(v))
+        return v
+
+
 def instanceof(t):
-    @chainable
-    def validator(v):
-        if not isinstance(v, t):
-            raise ValueError('value must be an instance of {}, was {}'.format(
-                t.__name__, type(v).__name__), 'instanceof')
+    return InstanceOf(t)
+
+
+class IsType(Validator):
+    __slots__ = fields = ('t',)
+    code = 'istype'
+
+    def __init__(self, t):
+        self.t = t
+
+    def check(self, v):
+        if type(v) is not self.t:
+            return invalid('value must be a {t.__name__}, was '
+                           '{vtype.__name__}', 'istype', t=self.t,
+                           vtype=type(v))
         return v
-    return validator
 
 
 def istype(t):
-    @chainable
-    def validator(v):
-        if type(v) is not t:
-            raise ValueError('value must be a {}, was {}'.format(
-                t.__name__, type(v).__name__), 'istype')
-        return v
-    return validator
+    return IsType(t)
 
 
-def isin(collection):
-    @chainable
-    def validator(s):
-        if s not in collection:
-            raise ValueError('value must be in {}'.format(collection),
-                             'isin')
+class IsIn(Validator):
+    __slots__ = fields = ('collection',)
+    code = 'isin'
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def check(self, s):
+        if s not in self.collection:
+            return invalid('value must be in {collection}', 'isin',
+                           collection=self.collection)
         return s
-    return validator
 
 
-def gte(num):
-    @chainable
-    def validator(v):
-        if not v >= num:
-            raise ValueError('value must be greater than {}'.format(num),
-                             'gte')
+def isin(collection):
+    return IsIn(collection)
+
+
+class Gte(Validator):
+    __slots__ = fields = ('num',)
+    code = 'gte'
+
+    def __init__(self, num):
+        self.num = num
+
+    def check(self, v):
+        if not v >= self.num:
+            return invalid('value must be greater than {num}', 'gte',
+                           num=self.num)
         return v
-    return validator
 
 
-def lte(num):
-    @chainable
-    def validator(v):
-        if not v <= num:
-            raise ValueError('value must be less than {}'.format(num),
-                             'lte')
+def gte(num):
+    return Gte(num)
+
+
+class Lte(Validator):
+    __slots__ = fields = ('num',)
+    code = 'lte'
+
+    def __init__(self, num):
+        self.num = num
+
+    def check(self, v):
+        if not v <= self.num:
+            return invalid('value must be less than {num}', 'lte',
+                           num=self.num)
         return v
-    return validator
 
 
-def match(regex):
-    @chainable
-    def validator(s):
+def lte(num):
+    return Lte(num)
+
+
+class Match(Validator):
+    __slots__ = ('regex', 'bytes_regex')
+    fields = ('regex',)
+    code = 'match'
+
+    def __init__(self, regex):
+        self.regex = regex
+        self.bytes_regex = None
+
+    def get_bytes_regex(self):
+        # Text patterns are converted to bytes patterns when first used with
+        # a bytes-like object, so the value is matched without decoding it.
+        # The bytes pattern is compiled right away (on first use, not when
+        # the validator is created), so that patterns that are not valid as
+        # bytes patterns (e.g., ``\N{...}`` escapes) fall back to the text
+        # pattern instead of raising from ``check()``. Objects that are not
+        # patterns are used as they are.
+        import re
+        try:
+            self.bytes_regex = bytes_pattern(self.regex).compile()
+        except (AttributeError, re.error):
+            self.bytes_regex = self.regex
+        return self.bytes_regex
+
+    def check(self, s):
+        if isinstance(s, TEXT):
+            regex = self.regex
+        else:
+            regex = self.bytes_regex or self.get_bytes_regex()
         try:
             if not regex.match(s):
-                raise ValueError('value does not match the expected format',
-                                 'match')
+                return invalid('value does not match the expected '
+                               'format', 'match')
         except TypeError:
-            raise ValueError('value of {} type cannot be tested for '
-                             'format'.format(type(s).__name__),
-                             'match')
+            return invalid('value of {vtype.__name__} type cannot be '
+                           'tested for format', 'match',
+                           vtype=type(s))
         return s
-    return validator
 
 
-def url(fn):
-    try:
-        return match(URL_RE)(fn)
-    except ValueError:
-        raise ValueError('value must be a valid URL', 'url')
+def match(regex):
+    return Match(regex)
 
 
-def timestamp(fmt):
-    @chainable
-    def validator(s):
+@described('url')
+@checkable
+def url(s):
+    if not is_url(s):
+        return invalid('value must be a valid URL', 'url')
+    return s
+
+
+class BoundedURL(Validator):
+    __slots__ = fields = ('max_length',)
+    code = 'url'
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+
+    def check(self, s):
         try:
-            datetime.datetime.strptime(s, fmt)
-        except ValueError:
-            raise ValueError("{} does not match the format '{}'".format(
-                s, fmt), 'timestamp')
+            too_long = len(s) > self.max_length
+        except TypeError:
+            too_long = False
+        if too_long:
+            return invalid('URL must not be longer than '
+                           '{max_length}', 'url',
+                           max_length=self.max_length)
+        return url.check(s)
+
+
+def bounded_url(max_length):
+    return BoundedURL(max_length)
+
+
+class Timestamp(Validator):
+    __slots__ = ('fmt', 'matches')
+    fields = ('fmt',)
+    code = 'timestamp'
+
+    def __init__(self, fmt):
+        # Imported here, so that ``datetime`` and ``calendar`` are only
+        # imported when timestamps are validated
+        from .timestamps import compile_format
+        self.fmt = fmt
+        self.matches = compile_format(fmt)
+
+    def check(self, s):
+        if not self.matches(s):
+            return invalid("{value} does not match the format "
+                           "'{fmt}'", 'timestamp', value=s,
+                           fmt=self.fmt)
         return s
-    return validator
 
 
-def min_len(min=1):
-    @chainable
-    def validator(v):
-        if v is None or len(v) < min:
-            message = "Key must be longer than {}, was {}".format(min, v)
-            raise ValueError(message, 'min_length')
+def timestamp(fmt):
+    return Timestamp(fmt)
+
+
+class MinLen(Validator):
+    __slots__ = fields = ('min',)
+    code = 'min_length'
+
+    def __init__(self, min=1):
+        self.min = min
+
+    def check(self, v):
+        if v is None or len(v) < self.min:
+            return invalid('Key must be longer than {min}, was '
+                           '{value}', 'min_length', min=self.min,
+                           value=v)
         return v
-    return validator
 
 
-def listof(item_validator):
-    @chainable
-    def validator(v):
-        if not isinstance(v, list):
-            raise ValueError("Value must be a list.", 'listof')
+def min_len(min=1):
+    return MinLen(min)
+
+
+def is_sequence(v):
+    """ Test whether value is a sequence of items that can be validated """
+    if isinstance(v, TEXT_TYPES) or isinstance(v, dict):
+        return False
+    return (hasattr(v, '__len__') and hasattr(v, '__getitem__') and
+            not isinstance(v, Mapping))
+
+
+def is_array(v):
+    """ Test whether value is a NumPy array """
+    numpy = load_numpy()
+    return numpy is not None and isinstance(v, numpy.ndarray)
+
+
+def item_error(error):
+    """ Return ``listof`` error for an error of a single list item """
+    if isinstance(error, ValidationError):
+        return ValidationError('List item validation failed with error: '
+                               '{error.message}', 'listof', error=error)
+    (message, validator_type) = error.args
+    return ValidationError('List item validation failed with error: {error}',
+                           'listof', error=message)
+
+
+class ListOf(Validator):
+    """ Validates each item of a sequence (see ``listof()``) """
+
+    __slots__ = ('item_validator', 'collect', 'item_check', 'many')
+    fields = ('item_validator', 'collect')
+    code = 'listof'
+
+    def __init__(self, item_validator, collect=False):
+        self.item_validator = item_validator
+        self.collect = collect
+        many = getattr(item_validator, 'many', None)
+        if many is None and describe([item_validator]) is not None:
+            many = make_chain([item_validator]).many
+        if not getattr(many, 'simple', False):
+            many = None
+        self.many = many
+        self.item_check = as_check(item_validator)
+
+    def collect_errors(self, v):
+        if self.many is not None:
+            return self.many(v)[1]
+        check = self.item_check
+        errors = []
+        for i, item in enumerate(v):
+            result = check(item)
+            if isinstance(result, Signal):
+                if result is STOP:
+                    return STOP
+                errors.append((i, result.error))
+        return errors
+
+    def check(self, v):
+        if not is_sequence(v):
+            return invalid("Value must be a list.", 'listof')
+        if self.collect:
+            errors = self.collect_errors(v)
+            if errors is STOP:
+                return STOP
+            if errors:
+                return invalid('List item validation failed for '
+                               '{count} items', 'listof',
+                               count=len(errors), errors=errors)
+            return v
+        if self.many is not None and is_array(v):
+            # Arrays are tested with vectorized operations, which are faster
+            # than stopping at the first invalid item
+            errors = self.many(v)[1]
+            if errors:
+                return Invalid(item_error(errors[0][1]))
+            return v
+        check = self.item_check
         for item in v:
-            try:
-                item_validator(item)
-            except ValueError as exc:
-                (error, validator_type) = exc.args
-                message = ("List item validation failed with error: "
-                           "{0}".format(error))
-                raise ValueError(message, 'listof')
+            result = check(item)
+            if isinstance(result, Signal):
+                if result is STOP:
+                    return STOP
+                return Invalid(item_error(result.error))
         return v
-    return validator
+
+
+def listof(item_validator, collect=False):
+    """ Return a validator that validates each item of a sequence
+
+    Any sequence is accepted (e.g., list, tuple, ``array.array``,
+    ``memoryview`` or NumPy array) except strings and dicts.
+
+    By default, validation stops at the first invalid item. If ``collect`` is
+    ``True``, all items are validated, and the error has an ``errors``
+    parameter, which is a list of ``(index, error)`` tuples for each invalid
+    item.
+
+    When ``item_validator`` is a built-in validator or a chain made only of
+    built-in validators that can be tested inline (see
+    ``validators.batch``), the items are validated using the chain's
+    ``many()`` method, which is vectorized for NumPy arrays.
+    """
+    return ListOf(item_validator, collect)